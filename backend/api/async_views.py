@@ -0,0 +1,236 @@
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from rest_framework.authentication import get_authorization_header
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from recipes.models import Ingredient, Recipe
+from .cache import (CATALOG_VERSION_KEY, aget_version, count_response,
+                    get_response_cache_key)
+from .conditional import get_ingredients_etag, get_recipe_etag
+from .constants import (CURSOR_PAGINATION, CURSOR_QUERY_PARAM,
+                        PAGINATION_QUERY_PARAM, RESPONSE_CACHE_TIMEOUT)
+from .filters import RecipeFilter
+from .ingredient_index import ingredient_index
+from .pagination import PageToOffsetPagination
+from .serializers import (IngredientSerializer, RecipeSerializer,
+                          UsersSerializer)
+
+User = get_user_model()
+
+
+def async_read_view(handler, fallback):
+    """Асинхронный GET с откатом на синхронное представление DRF.
+
+    Обработчик возвращает None, если запрос не подходит для быстрого
+    пути: другой метод, формат, курсорная пагинация, неверный токен
+    или ошибка фильтра. Тогда ответ формирует обычный ViewSet.
+    """
+    fallback = sync_to_async(fallback)
+
+    async def view(request, **kwargs):
+        if (request.method == 'GET' and 'format' not in request.GET
+                and 'text/html' not in request.headers.get('Accept', '')):
+            response = await handler(request, **kwargs)
+            if response is not None:
+                return response
+        return await fallback(request, **kwargs)
+
+    view.csrf_exempt = True
+    return view
+
+
+def render(data, status=200, cache_status=None):
+    response = HttpResponse(JSONRenderer().render(data), status=status,
+                            content_type='application/json')
+    response['Vary'] = 'Accept'
+    if cache_status:
+        response['X-Cache'] = cache_status
+    return response
+
+
+async def check_etag(request, etag_func, *args):
+    """ETag ответа и готовый 304, если клиент прислал тот же ETag.
+
+    Быстрый путь отдаёт только JSON, поэтому формат в ETag тот же,
+    что у JSONRenderer в синхронных представлениях.
+    """
+    etag = await sync_to_async(etag_func)(*args, 'json')
+    if etag is None:
+        return None, None
+    etag = quote_etag(etag)
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        # Как в django.views.decorators.http.condition: 304 и 412 несут ETag
+        not_modified['ETag'] = etag
+    return etag, not_modified
+
+
+def not_found(model):
+    return render({'detail': f'No {model._meta.object_name} matches '
+                             'the given query.'}, status=404)
+
+
+async def authenticate(request):
+    header = get_authorization_header(request).split()
+    if not header or header[0].lower() != b'token':
+        return AnonymousUser()
+    if len(header) != 2:
+        return None
+    try:
+        token = await Token.objects.select_related('user').aget(
+            key=header[1].decode()
+        )
+    except (Token.DoesNotExist, UnicodeError):
+        return None
+    return token.user if token.user.is_active else None
+
+
+async def get_api_request(request):
+    user = await authenticate(request)
+    if user is None:
+        return None
+    api_request = Request(request)
+    api_request.user = user
+    if user.is_authenticated:
+        api_request._followed_author_ids = {
+            author_id async for author_id
+            in user.followers.values_list('author_id', flat=True)
+        }
+    return api_request
+
+
+async def cached_data(request, build, *args):
+    if request.user.is_authenticated:
+        return await build(request, *args), None
+    key = get_response_cache_key(
+        request, await aget_version(CATALOG_VERSION_KEY)
+    )
+    data = await cache.aget(key)
+    if data is not None:
+        count_response('HIT')
+        return data, 'HIT'
+    count_response('MISS')
+    data = await build(request, *args)
+    if data is not None:
+        await cache.aset(key, data, timeout=RESPONSE_CACHE_TIMEOUT)
+    return data, 'MISS'
+
+
+def get_recipe_queryset(user):
+    return Recipe.objects.with_related().with_user_flags(user)
+
+
+def filter_recipes(filterset):
+    # Фильтры ходят в базу синхронно: ?have= обновляет индекс рецептов
+    return filterset.qs if filterset.is_valid() else None
+
+
+async def build_recipe_list(request):
+    filterset = RecipeFilter(request.query_params,
+                             get_recipe_queryset(request.user),
+                             request=request)
+    queryset = await sync_to_async(filter_recipes)(filterset)
+    if queryset is None:
+        return None
+    paginator = PageToOffsetPagination()
+    page = await paginator.apaginate_queryset(queryset, request)
+    serializer = RecipeSerializer(page, many=True,
+                                  context={'request': request})
+    return paginator.get_paginated_response(serializer.data).data
+
+
+async def build_recipe_detail(request, pk):
+    recipe = await get_recipe_queryset(request.user).aget(pk=pk)
+    return RecipeSerializer(recipe, context={'request': request}).data
+
+
+async def recipe_list(request):
+    if (request.GET.get(PAGINATION_QUERY_PARAM) == CURSOR_PAGINATION
+            or CURSOR_QUERY_PARAM in request.GET):
+        return None
+    request = await get_api_request(request)
+    if request is None:
+        return None
+    data, cache_status = await cached_data(request, build_recipe_list)
+    if data is None:
+        return None
+    return render(data, cache_status=cache_status)
+
+
+async def recipe_detail(request, pk):
+    request = await get_api_request(request)
+    if request is None:
+        return None
+    etag, not_modified = await check_etag(
+        request, get_recipe_etag, request.user, pk, request.get_host()
+    )
+    if not_modified is not None:
+        return not_modified
+    try:
+        data, cache_status = await cached_data(request, build_recipe_detail,
+                                               pk)
+    except Recipe.DoesNotExist:
+        return not_found(Recipe)
+    response = render(data, cache_status=cache_status)
+    response['ETag'] = etag
+    return response
+
+
+async def ingredient_list(request):
+    if await authenticate(request) is None:
+        return None
+    etag, not_modified = await check_etag(
+        request, get_ingredients_etag, request.META.get('QUERY_STRING', '')
+    )
+    if not_modified is not None:
+        return not_modified
+    name = request.GET.get('name')
+    if name:
+        response = render(
+            await sync_to_async(ingredient_index.search)(name)
+        )
+    else:
+        ingredients = [
+            ingredient async for ingredient
+            in Ingredient.objects.order_by('name').aiterator()
+        ]
+        response = render(IngredientSerializer(ingredients, many=True).data)
+    response['ETag'] = etag
+    return response
+
+
+async def ingredient_detail(request, pk):
+    if await authenticate(request) is None:
+        return None
+    try:
+        ingredient = await Ingredient.objects.aget(pk=pk)
+    except Ingredient.DoesNotExist:
+        return not_found(Ingredient)
+    return render(IngredientSerializer(ingredient).data)
+
+
+async def user_detail(request, id):
+    request = await get_api_request(request)
+    if request is None:
+        return None
+    try:
+        user = await User.objects.aget(pk=id)
+    except User.DoesNotExist:
+        return not_found(User)
+    return render(UsersSerializer(user, context={'request': request}).data)
+
+
+async def user_me(request):
+    request = await get_api_request(request)
+    if request is None or not request.user.is_authenticated:
+        return None
+    return render(
+        UsersSerializer(request.user, context={'request': request}).data
+    )
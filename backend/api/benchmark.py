@@ -0,0 +1,15 @@
+import base64
+import io
+
+from PIL import Image
+
+# Домен адресов пользователей, которых создаёт generate_dataset
+EMAIL_DOMAIN = 'bench.example.com'
+
+
+def make_image():
+    """Маленькая PNG-картинка в виде data URI для запросов к API."""
+    buffer = io.BytesIO()
+    Image.new('RGB', (8, 8)).save(buffer, 'PNG')
+    return ('data:image/png;base64,'
+            + base64.b64encode(buffer.getvalue()).decode())
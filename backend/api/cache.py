@@ -0,0 +1,140 @@
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlencode
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Tags, Warning, register
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.response import Response
+
+from recipes.models import Ingredient, Recipe
+from .constants import RESPONSE_CACHE_TIMEOUT
+
+User = get_user_model()
+
+CATALOG_VERSION_KEY = 'catalog_version'
+
+# Счётчики попаданий ведёт каждый процесс сам: запись в общий кэш
+# на каждый запрос стоила бы лишних обращений к базе
+response_cache_stats = Counter()
+stats_lock = threading.Lock()
+
+
+def count_response(cache_status):
+    with stats_lock:
+        response_cache_stats[cache_status] += 1
+
+
+def new_version():
+    # Ключ версии может быть вытеснен из кэша; версия от времени не совпадёт
+    # с прежними значениями, в отличие от счёта заново с единицы
+    return time.time_ns()
+
+
+def get_version(key):
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, new_version(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+async def aget_version(key):
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, new_version(), timeout=None)
+        version = await cache.aget(key)
+    return version
+
+
+def bump_version(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, new_version(), timeout=None)
+
+
+def invalidate_catalog():
+    bump_version(CATALOG_VERSION_KEY)
+
+
+def get_cache_stats():
+    with stats_lock:
+        stats = dict(response_cache_stats)
+    return {
+        'version': cache.get(CATALOG_VERSION_KEY),
+        'hits': stats.get('HIT', 0),
+        'misses': stats.get('MISS', 0),
+    }
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    if isinstance(caches['default'], LocMemCache):
+        return [Warning(
+            'Кэш по умолчанию — LocMemCache: версия каталога и кэш ответов '
+            'не будут общими для воркеров и команд управления.',
+            hint='Используйте DatabaseCache или REDIS_URL.',
+            id='api.W001',
+        )]
+    return []
+
+
+def get_response_cache_key(request, version):
+    query = urlencode(sorted(request.query_params.lists()), doseq=True)
+    return f'response:{version}:{request.get_host()}{request.path}?{query}'
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_delete, sender=User)
+def catalog_changed(**kwargs):
+    transaction.on_commit(invalidate_catalog)
+
+
+@receiver(post_save, sender=User)
+def user_changed(update_fields=None, **kwargs):
+    if update_fields is None or set(update_fields) != {'last_login'}:
+        transaction.on_commit(invalidate_catalog)
+
+
+class AnonymousCacheMixin:
+    """Кэширует ответы list и retrieve для анонимных пользователей.
+
+    Ключ включает версию каталога, поэтому любое изменение рецептов,
+    ингредиентов или профилей делает старые ответы недостижимыми.
+    Версия хранится в кэше по умолчанию, и он должен быть общим для всех
+    процессов (DatabaseCache или Redis, см. CACHES), иначе изменения
+    из других воркеров и команд управления здесь не видны. Счётчики
+    попаданий и промахов в cache-stats относятся к текущему процессу.
+    """
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return handler(request, *args, **kwargs)
+        key = get_response_cache_key(request,
+                                     get_version(CATALOG_VERSION_KEY))
+        data = cache.get(key)
+        if data is not None:
+            count_response('HIT')
+            return Response(data, headers={'X-Cache': 'HIT'})
+        count_response('MISS')
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, timeout=RESPONSE_CACHE_TIMEOUT)
+        response['X-Cache'] = 'MISS'
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request,
+                                    *args, **kwargs)
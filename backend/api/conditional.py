@@ -0,0 +1,52 @@
+import hashlib
+
+from django.db.models import Exists, OuterRef, Value
+from django.views.decorators.http import condition
+
+from recipes.models import Ingredient, Recipe, Subscription
+
+
+def make_etag(*parts):
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+
+def get_recipe_etag(user, pk, host, renderer_format):
+    """ETag рецепта по полям, от которых зависит ответ, без сериализации.
+
+    Изменения ингредиентов рецепта обновляют updated_at, флаги
+    пользователя и данные автора берутся тем же запросом.
+    """
+    queryset = Recipe.objects.filter(pk=pk).with_user_flags(user)
+    if user.is_authenticated:
+        queryset = queryset.annotate(is_subscribed=Exists(
+            Subscription.objects.filter(user=user, author=OuterRef('author'))
+        ))
+    else:
+        queryset = queryset.annotate(is_subscribed=Value(False))
+    row = queryset.values_list(
+        'updated_at', 'is_favorited', 'is_in_shopping_cart',
+        'is_subscribed', 'author__email', 'author__username',
+        'author__first_name', 'author__last_name', 'author__avatar'
+    ).first()
+    if row is None:
+        return None
+    return make_etag('recipe', pk, host, renderer_format, *row)
+
+
+def get_ingredients_etag(query, renderer_format):
+    return make_etag('ingredients', query, renderer_format,
+                     *Ingredient.objects.version())
+
+
+def recipe_etag(request, pk, *args, **kwargs):
+    return get_recipe_etag(request.user, pk, request.get_host(),
+                           request.accepted_renderer.format)
+
+
+def ingredients_etag(request, *args, **kwargs):
+    return get_ingredients_etag(request.META.get('QUERY_STRING', ''),
+                                request.accepted_renderer.format)
+
+
+recipe_condition = condition(etag_func=recipe_etag)
+ingredients_condition = condition(etag_func=ingredients_etag)
@@ -2,9 +2,35 @@
 PAGE_SIZE = 6
 MAX_PAGE_SIZE = 100
 LIMIT_QUERY_PARAM = 'limit'
+CURSOR_QUERY_PARAM = 'cursor'
+PAGINATION_QUERY_PARAM = 'pagination'  # ?pagination=cursor — режим курсора
+CURSOR_PAGINATION = 'cursor'
 
 # Константы для рецептов (serializers.py)
 MIN_COOKING_TIME = 1  # Минимальное время приготовления (в мин.)
 MAX_COOKING_TIME = 600  # Максимальное время приготовления (в мин.)
 MIN_INGREDIENT_AMOUNT = 1  # Минимальное количество ингредиента
 MAX_INGREDIENT_AMOUNT = 1000  # Максимальное количество ингредиента
+
+# Константы для подписок (serializers.py)
+RECIPES_LIMIT = 3  # Рецептов автора в списке подписок по умолчанию
+MAX_RECIPES_LIMIT = 50  # Максимальное значение recipes_limit
+
+# Константы для поиска ингредиентов (ingredient_index.py)
+INGREDIENT_SEARCH_LIMIT = 50  # Максимум подсказок при поиске по названию
+INGREDIENT_INDEX_CHECK_INTERVAL = 5  # Как часто сверять версию (в сек.)
+
+# Константы для подбора рецептов по продуктам (recipe_index.py)
+MATCH_RESULTS_LIMIT = 500  # Максимум рецептов в ответе на ?have=
+MATCH_CHECK_INTERVAL = 5  # Как часто сверять индекс с базой (в сек.)
+MATCH_CHANGES_OVERLAP = 60  # Запас на поздно закоммиченные правки (в сек.)
+
+# Константы для кэша ответов (cache.py)
+RESPONSE_CACHE_TIMEOUT = 60 * 15  # Время жизни ответа в кэше (в сек.)
+
+# Константы для загрузки изображений (fields.py)
+MAX_IMAGE_SIZE = 5 * 1024 * 1024  # Максимальный размер файла (в байтах)
+MAX_IMAGE_PIXELS = 4096 * 4096  # Максимальное количество пикселей
+IMAGE_SPOOL_SIZE = 1024 * 1024  # Больше этого размера файл пишется на диск
+DECODE_CHUNK_SIZE = 64 * 1024  # Символов base64 за один шаг декодирования
+IMAGE_FORMATS = {'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif', 'WEBP': 'webp'}
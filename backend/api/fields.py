@@ -0,0 +1,94 @@
+import base64
+import binascii
+import uuid
+from tempfile import SpooledTemporaryFile
+
+from django.core.files.uploadedfile import UploadedFile
+from PIL import Image
+from rest_framework import serializers
+
+from .constants import (DECODE_CHUNK_SIZE, IMAGE_FORMATS, IMAGE_SPOOL_SIZE,
+                        MAX_IMAGE_PIXELS, MAX_IMAGE_SIZE)
+
+BASE64_SEPARATOR = ';base64,'
+
+
+class Base64ImageField(serializers.FileField):
+    """Изображение в base64 с ограничением размера.
+
+    Строка декодируется по частям во временный файл, размер в байтах
+    и в пикселях проверяется до полной распаковки изображения, а формат
+    определяется по содержимому, а не по заголовку data URI.
+    """
+
+    default_error_messages = {
+        'invalid_base64': 'Изображение должно быть закодировано в base64.',
+        'invalid_image': 'Загрузите изображение в формате '
+                         'JPEG, PNG, GIF или WebP.',
+        'too_large': 'Размер изображения не должен превышать '
+                     '{max_size} МБ.',
+        'too_many_pixels': 'Изображение не должно быть больше '
+                           '{max_pixels} пикселей.',
+    }
+
+    def to_internal_value(self, data):
+        if data in ('', None):
+            if self.allow_null:
+                return None
+            self.fail('required')
+        if isinstance(data, str):
+            data = self.decode(data)
+        elif not isinstance(data, UploadedFile):
+            self.fail('invalid_image')
+        return super().to_internal_value(self.check_image(data))
+
+    def fail_too_large(self):
+        self.fail('too_large', max_size=MAX_IMAGE_SIZE // (1024 * 1024))
+
+    def decode(self, data):
+        start = data.find(BASE64_SEPARATOR)
+        start = 0 if start == -1 else start + len(BASE64_SEPARATOR)
+        if (len(data) - start) * 3 // 4 > MAX_IMAGE_SIZE:
+            self.fail_too_large()
+        file = SpooledTemporaryFile(max_size=IMAGE_SPOOL_SIZE)
+        leftover = ''
+        try:
+            for position in range(start, len(data), DECODE_CHUNK_SIZE):
+                # Переносы строк (base64 по MIME) убираются в каждой части,
+                # а хвост, не кратный 4 символам, переходит в следующую
+                chunk = leftover + ''.join(
+                    data[position:position + DECODE_CHUNK_SIZE].split()
+                )
+                end = len(chunk) - len(chunk) % 4
+                file.write(base64.b64decode(chunk[:end], validate=True))
+                leftover = chunk[end:]
+            if leftover:
+                raise binascii.Error('Incorrect padding')
+        except binascii.Error:
+            file.close()
+            self.fail('invalid_base64')
+        size = file.tell()
+        file.seek(0)
+        return UploadedFile(file, name='image', size=size)
+
+    def check_image(self, file):
+        if file.size > MAX_IMAGE_SIZE:
+            self.fail_too_large()
+        try:
+            image = Image.open(file)
+            width, height = image.size
+            image_format = image.format
+            if width * height <= MAX_IMAGE_PIXELS:
+                image.verify()
+        except Image.DecompressionBombError:
+            self.fail('too_many_pixels', max_pixels=MAX_IMAGE_PIXELS)
+        except (OSError, SyntaxError, ValueError):
+            self.fail('invalid_image')
+        if width * height > MAX_IMAGE_PIXELS:
+            self.fail('too_many_pixels', max_pixels=MAX_IMAGE_PIXELS)
+        if image_format not in IMAGE_FORMATS:
+            self.fail('invalid_image')
+        file.seek(0)
+        file.name = f'{uuid.uuid4()}.{IMAGE_FORMATS[image_format]}'
+        file.content_type = Image.MIME[image_format]
+        return file
@@ -1,56 +1,54 @@
-from django.db.models import OuterRef, Exists
+from django.db.models import Case, IntegerField, When
 from django_filters import rest_framework
 
-from recipes.models import ShoppingCart, FavoriteRecipe, Recipe
+from recipes.models import Recipe
+from .recipe_index import recipe_ingredient_index
+
+
+class NumberInFilter(rest_framework.BaseInFilter,
+                     rest_framework.NumberFilter):
+    pass
 
 
 class RecipeFilter(rest_framework.FilterSet):
     is_in_shopping_cart = rest_framework.BooleanFilter(
         method='filter_is_in_shopping_cart')
     is_favorited = rest_framework.BooleanFilter(method='filter_is_favorited')
+    search = rest_framework.CharFilter(method='filter_search')
+    have = NumberInFilter(method='filter_have')
+    max_missing = rest_framework.NumberFilter(method='filter_max_missing',
+                                              min_value=0)
 
     class Meta:
         model = Recipe
         fields = ['name', 'author']
 
-    def filter_is_in_shopping_cart(self, shoppingcart, name, value):
+    def filter_is_in_shopping_cart(self, queryset, name, value):
         if self.request.user.is_authenticated:
-            if value:
-                return shoppingcart.filter(
-                    Exists(
-                        ShoppingCart.objects.filter(
-                            user=self.request.user,
-                            recipe=OuterRef('pk')
-                        )
-                    )
-                )
-            return shoppingcart.exclude(
-                Exists(
-                    ShoppingCart.objects.filter(
-                        user=self.request.user,
-                        recipe=OuterRef('pk')
-                    )
-                )
-            )
-        return shoppingcart
-
-    def filter_is_favorited(self, favorite, name, value):
+            return queryset.filter(is_in_shopping_cart=value)
+        return queryset
+
+    def filter_is_favorited(self, queryset, name, value):
         if self.request.user.is_authenticated:
-            if value:
-                return favorite.filter(
-                    Exists(
-                        FavoriteRecipe.objects.filter(
-                            user=self.request.user,
-                            recipe=OuterRef('pk')
-                        )
-                    )
-                )
-            return favorite.exclude(
-                Exists(
-                    FavoriteRecipe.objects.filter(
-                        user=self.request.user,
-                        recipe=OuterRef('pk')
-                    )
-                )
-            )
-        return favorite
+            return queryset.filter(is_favorited=value)
+        return queryset
+
+    def filter_search(self, queryset, name, value):
+        return queryset.search(value) if value.strip() else queryset
+
+    def filter_have(self, queryset, name, value):
+        recipe_ids = recipe_ingredient_index.match(
+            [int(ingredient_id) for ingredient_id in value],
+            int(self.form.cleaned_data.get('max_missing') or 0)
+        )
+        if not recipe_ids:
+            return queryset.none()
+        return queryset.filter(pk__in=recipe_ids).order_by(Case(
+            *(When(pk=recipe_id, then=position)
+              for position, recipe_id in enumerate(recipe_ids)),
+            output_field=IntegerField()
+        ))
+
+    def filter_max_missing(self, queryset, name, value):
+        # Учитывается в filter_have
+        return queryset
@@ -0,0 +1,122 @@
+import bisect
+import threading
+from collections import defaultdict
+from time import monotonic
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from recipes.models import Ingredient
+from .constants import (INGREDIENT_INDEX_CHECK_INTERVAL,
+                        INGREDIENT_SEARCH_LIMIT)
+
+
+def get_trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class IngredientSnapshot:
+    """Неизменяемый снимок каталога ингредиентов для автодополнения.
+
+    Отсортированный массив имён отвечает на поиск по префиксу, триграммы
+    сужают поиск по подстроке.
+    """
+
+    def __init__(self, ingredients):
+        self.ingredients = ingredients
+        self.names = [
+            ingredient['name'].casefold() for ingredient in ingredients
+        ]
+        prefixes = sorted(
+            (name, position) for position, name in enumerate(self.names)
+        )
+        self.prefix_keys = [name for name, _ in prefixes]
+        self.prefix_positions = [position for _, position in prefixes]
+        postings = defaultdict(list)
+        for position, name in enumerate(self.names):
+            for trigram in get_trigrams(name):
+                postings[trigram].append(position)
+        self.postings = dict(postings)
+
+    def candidates(self, query):
+        trigrams = get_trigrams(query)
+        if not trigrams:
+            return range(len(self.names))
+        postings = sorted(
+            (self.postings.get(trigram, ()) for trigram in trigrams), key=len
+        )
+        positions = set(postings[0])
+        for posting in postings[1:]:
+            positions.intersection_update(posting)
+        return sorted(positions)
+
+    def search(self, query, limit):
+        found = []
+        start = bisect.bisect_left(self.prefix_keys, query)
+        for key, position in zip(self.prefix_keys[start:],
+                                 self.prefix_positions[start:]):
+            if len(found) >= limit or not key.startswith(query):
+                break
+            found.append(position)
+        if len(found) < limit:
+            prefix_matches = set(found)
+            for position in self.candidates(query):
+                if (position not in prefix_matches
+                        and query in self.names[position]):
+                    found.append(position)
+                    if len(found) >= limit:
+                        break
+        return [self.ingredients[position] for position in found]
+
+
+class IngredientIndex:
+    """Индекс ингредиентов в памяти процесса для автодополнения.
+
+    Не чаще раза в INGREDIENT_INDEX_CHECK_INTERVAL секунд индекс сверяет
+    версию каталога в базе (число строк и последний updated_at), так что
+    изменения из других процессов и команд видны всем воркерам. Новый
+    снимок строится целиком и подменяется одним присваиванием: поиск
+    в других потоках не видит наполовину собранный индекс.
+    """
+
+    def __init__(self):
+        self.snapshot = None
+        self.version = None
+        self.checked_at = None
+        self.lock = threading.Lock()
+
+    def is_checked(self):
+        return (self.checked_at is not None and monotonic() - self.checked_at
+                < INGREDIENT_INDEX_CHECK_INTERVAL)
+
+    def ensure_fresh(self):
+        if not self.is_checked():
+            with self.lock:
+                if not self.is_checked():
+                    version = Ingredient.objects.version()
+                    if version != self.version:
+                        self.snapshot = IngredientSnapshot(list(
+                            Ingredient.objects
+                            .order_by('name', 'measurement_unit')
+                            .values('id', 'name', 'measurement_unit')
+                        ))
+                        self.version = version
+                    self.checked_at = monotonic()
+        return self.snapshot
+
+    def invalidate(self):
+        self.checked_at = None
+
+    def search(self, query, limit=INGREDIENT_SEARCH_LIMIT):
+        return self.ensure_fresh().search(query.casefold(), limit)
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def ingredient_changed(using, **kwargs):
+    # Свой процесс сверяет версию сразу, остальные — по интервалу
+    transaction.on_commit(ingredient_index.invalidate, using=using)
+
+
+ingredient_index = IngredientIndex()
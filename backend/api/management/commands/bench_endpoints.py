@@ -0,0 +1,149 @@
+import json
+import platform
+from statistics import quantiles
+from time import perf_counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIClient
+
+from api.benchmark import EMAIL_DOMAIN, make_image
+from recipes.models import Ingredient, Recipe, User
+
+# Ингредиентов в рецепте для сценария recipe_create_large
+LARGE_RECIPE_INGREDIENTS = 40
+
+
+class Command(BaseCommand):
+    help = ('Измеряет задержки и число SQL-запросов основных эндпоинтов '
+            'внутри процесса и сохраняет результат в JSON')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=50,
+                            help='Повторов на эндпоинт, не меньше 2')
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--output', default='benchmark.json',
+                            help='Файл с результатами')
+        parser.add_argument('--budgets',
+                            help='JSON вида {"recipe_list": {"p95_ms": 50, '
+                                 '"queries": 5}}; при превышении команда '
+                                 'завершается с ошибкой')
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 2:
+            raise CommandError('Для перцентилей нужно --repeat не меньше 2.')
+        user = (
+            User.objects.filter(email__endswith=f'@{EMAIL_DOMAIN}')
+            .order_by('id').first()
+            or User.objects.order_by('id').first()
+        )
+        recipe = Recipe.objects.order_by('-created_at', '-id').first()
+        ingredient_ids = list(
+            Ingredient.objects.values_list('id', flat=True)
+            [:LARGE_RECIPE_INGREDIENTS]
+        )
+        if user is None or recipe is None or not ingredient_ids:
+            raise CommandError('База пуста, выполните generate_dataset.')
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        image = make_image()
+
+        def create_recipe(ingredient_ids):
+            return self.client.post(
+                '/api/recipes/',
+                {'name': 'Тестовый рецепт', 'text': 'Описание',
+                 'cooking_time': 10, 'image': image,
+                 'ingredients': [{'id': ingredient_id, 'amount': 1}
+                                 for ingredient_id in ingredient_ids]},
+                format='json'
+            )
+
+        scenarios = {
+            'recipe_list': lambda: self.client.get('/api/recipes/'),
+            'recipe_detail': lambda: self.client.get(
+                f'/api/recipes/{recipe.id}/'
+            ),
+            'subscriptions': lambda: self.client.get(
+                '/api/users/subscriptions/'
+            ),
+            'download_shopping_cart': lambda: self.client.get(
+                '/api/recipes/download_shopping_cart/'
+            ),
+            'ingredient_list': lambda: self.client.get('/api/ingredients/'),
+            'ingredient_search': lambda: self.client.get(
+                '/api/ingredients/', {'name': 'са'}
+            ),
+            'recipe_create': lambda: create_recipe(ingredient_ids[:10]),
+            'recipe_create_large': lambda: create_recipe(ingredient_ids),
+        }
+        hosts = [*settings.ALLOWED_HOSTS, 'testserver']
+        with override_settings(ALLOWED_HOSTS=hosts):
+            results = {
+                name: self.measure(request, options)
+                for name, request in scenarios.items()
+            }
+        report = {
+            'python': platform.python_version(),
+            'database': connection.vendor,
+            'recipes': Recipe.objects.count(),
+            'users': User.objects.count(),
+            'repeat': options['repeat'],
+            'endpoints': results,
+        }
+        with open(options['output'], 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2,
+                      sort_keys=True)
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name}: p50 {result["p50_ms"]} мс, '
+                f'p95 {result["p95_ms"]} мс, p99 {result["p99_ms"]} мс, '
+                f'{result["queries"]} запросов'
+            )
+        if options['budgets']:
+            self.check_budgets(results, options['budgets'])
+
+    def measure(self, request, options):
+        timings = []
+        for number in range(options['warmup'] + options['repeat']):
+            with transaction.atomic():
+                with CaptureQueriesContext(connection) as queries:
+                    started = perf_counter()
+                    response = request()
+                    if response.streaming:
+                        # Потоковый ответ формируется при чтении
+                        b''.join(response.streaming_content)
+                    elapsed = perf_counter() - started
+                if response.status_code >= 400:
+                    raise CommandError(
+                        f'{response.request["PATH_INFO"]}: '
+                        f'{response.status_code} {response.content[:200]}'
+                    )
+                if response.status_code == 201:
+                    Recipe.objects.get(
+                        pk=response.data['id']
+                    ).image.delete(save=False)
+                transaction.set_rollback(True)
+            if number >= options['warmup']:
+                timings.append(elapsed * 1000)
+        percentiles = quantiles(timings, n=100, method='inclusive')
+        return {
+            'p50_ms': round(percentiles[49], 2),
+            'p95_ms': round(percentiles[94], 2),
+            'p99_ms': round(percentiles[98], 2),
+            'queries': len(queries),
+        }
+
+    def check_budgets(self, results, path):
+        with open(path, encoding='utf-8') as file:
+            budgets = json.load(file)
+        exceeded = [
+            f'{name}.{metric}: {results[name][metric]} > {limit}'
+            for name, limits in budgets.items() if name in results
+            for metric, limit in limits.items()
+            if results[name][metric] > limit
+        ]
+        if exceeded:
+            raise CommandError('Превышены бюджеты: ' + '; '.join(exceeded))
+        self.stdout.write(self.style.SUCCESS('Бюджеты соблюдены.'))
@@ -0,0 +1,285 @@
+import json
+import random
+import re
+import threading
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from statistics import quantiles
+from time import monotonic, perf_counter, sleep
+
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.benchmark import make_image
+
+DEFAULT_COLLECTION = (Path(settings.BASE_DIR).parent / 'postman_collection'
+                      / 'foodgram.postman_collection.json')
+# Папки, которые меняют учётные данные, удаляют общие объекты
+# или специально шлют неверные запросы
+DEFAULT_EXCLUDE = ('register_and_get_tokens', 'reset_password',
+                   'delete_requests', 'bad_requests')
+EXPECTED_STATUS = re.compile(r'Статус-код ответа должен быть (\d{3})')
+VARIABLE = re.compile(r'\{\{(\w+)\}\}')
+RECIPE_VARIABLES = ('firstRecipeId', 'secondRecipeId', 'thirdRecipeId',
+                    'fourthRecipeId', 'fifthRecipeId')
+
+
+def get_expected_status(item):
+    for event in item.get('event', ()):
+        if event['listen'] == 'test':
+            found = EXPECTED_STATUS.search('\n'.join(event['script']['exec']))
+            if found:
+                return int(found.group(1))
+    return None
+
+
+def read_scenarios(items, exclude, path=(), auth=None):
+    """Листовые папки коллекции — сценарии из запросов по порядку."""
+    scenarios = {}
+    requests_ = []
+    for item in items:
+        if any(name in item['name'] for name in exclude):
+            continue
+        if 'item' in item:
+            scenarios.update(read_scenarios(
+                item['item'], exclude, (*path, item['name']),
+                item.get('auth', auth)
+            ))
+            continue
+        request = item['request']
+        url = request['url']
+        requests_.append({
+            'method': request['method'],
+            'url': url['raw'] if isinstance(url, dict) else url,
+            'body': request.get('body', {}).get('raw'),
+            'auth': request.get('auth') or auth,
+            'expected': get_expected_status(item),
+        })
+    if requests_:
+        scenarios['/'.join(path) or 'root'] = requests_
+    return scenarios
+
+
+def get_auth_header(auth, variables):
+    if not auth or auth['type'] != 'apikey':
+        return {}
+    fields = {field['key']: field['value'] for field in auth['apikey']}
+    return {fields['key']: substitute(fields['value'], variables)}
+
+
+def substitute(text, variables):
+    return VARIABLE.sub(lambda match: str(variables[match.group(1)]), text)
+
+
+class Command(BaseCommand):
+    help = ('Нагружает запущенный сервер смесью сценариев из '
+            'Postman-коллекции и выводит пропускную способность, долю '
+            'ошибок и перцентили задержек по эндпоинтам')
+
+    def add_arguments(self, parser):
+        parser.add_argument('server', nargs='?',
+                            help='Адрес сервера (по умолчанию baseUrl '
+                                 'из коллекции)')
+        parser.add_argument('--collection', default=DEFAULT_COLLECTION)
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--duration', type=float, default=60,
+                            help='Длительность нагрузки (в сек.)')
+        parser.add_argument('--ramp-up', type=float, default=10,
+                            help='За сколько секунд подключаются '
+                                 'все клиенты')
+        parser.add_argument('--users', type=int,
+                            help='Сколько пользователей создать для '
+                                 'нагрузки (по умолчанию по одному '
+                                 'на клиента)')
+        parser.add_argument('--exclude', nargs='*', default=DEFAULT_EXCLUDE,
+                            help='Пропускать папки с этими словами '
+                                 'в названии')
+        parser.add_argument('--weight', nargs='*', default=(),
+                            metavar='SCENARIO=WEIGHT',
+                            help='Вес сценария; по умолчанию — число '
+                                 'запросов в нём')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--output', help='Сохранить отчёт в JSON')
+
+    def handle(self, *args, **options):
+        path = Path(options['collection'])
+        if not path.is_file():
+            raise CommandError(f'Не найдена коллекция {path}, '
+                               'укажите её через --collection.')
+        with open(path, encoding='utf-8') as file:
+            collection = json.load(file)
+        self.base_variables = {
+            variable['key']: variable['value']
+            for variable in collection.get('variable', ())
+        }
+        self.server = (options['server']
+                       or self.base_variables['baseUrl']).rstrip('/')
+        self.base_variables['baseUrl'] = self.server
+        self.scenarios = read_scenarios(collection['item'],
+                                        options['exclude'])
+        if not self.scenarios:
+            raise CommandError('В коллекции не осталось сценариев.')
+        weights = {name: len(scenario)
+                   for name, scenario in self.scenarios.items()}
+        for override in options['weight']:
+            name, _, weight = override.partition('=')
+            if name not in weights:
+                raise CommandError(f'Нет сценария {name}.')
+            weights[name] = float(weight)
+        self.names = list(weights)
+        self.weights = [weights[name] for name in self.names]
+        self.prepare(options['users'] or options['concurrency'])
+        self.stats = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.lock = threading.Lock()
+        deadline = monotonic() + options['ramp_up'] + options['duration']
+        started = perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            clients = [
+                pool.submit(
+                    self.run_client, number,
+                    options['ramp_up'] * number / options['concurrency'],
+                    deadline, options['seed']
+                )
+                for number in range(options['concurrency'])
+            ]
+        for client in clients:
+            client.result()
+        self.report(perf_counter() - started, options['output'])
+
+    def prepare(self, count):
+        """Создаёт пользователей с рецептами, на которых идёт нагрузка."""
+        session = requests.Session()
+        ingredients = session.get(f'{self.server}/api/ingredients/').json()
+        if len(ingredients) < 2:
+            raise CommandError('В базе меньше двух ингредиентов.')
+        self.ingredients = ingredients
+        image = make_image()
+        self.users = []
+        for _ in range(count):
+            suffix = uuid.uuid4().hex[:12]
+            credentials = {'email': f'load-{suffix}@example.com',
+                           'password': uuid.uuid4().hex}
+            response = session.post(f'{self.server}/api/users/', json={
+                **credentials, 'username': f'load-{suffix}',
+                'first_name': 'Нагрузка', 'last_name': 'Тест',
+            })
+            if response.status_code != 201:
+                raise CommandError(f'Не удалось создать пользователя: '
+                                   f'{response.text[:200]}')
+            user = {**credentials, 'username': f'load-{suffix}',
+                    'id': response.json()['id']}
+            user['token'] = session.post(
+                f'{self.server}/api/auth/token/login/', json=credentials
+            ).json()['auth_token']
+            user['recipes'] = [
+                session.post(
+                    f'{self.server}/api/recipes/',
+                    headers={'Authorization': f'Token {user["token"]}'},
+                    json={'name': f'Рецепт нагрузки {number}',
+                          'text': 'Описание', 'cooking_time': 10,
+                          'image': image,
+                          'ingredients': [
+                              {'id': ingredient['id'], 'amount': 1}
+                              for ingredient in ingredients[:2]
+                          ]}
+                ).json()['id']
+                for number in range(len(RECIPE_VARIABLES))
+            ]
+            self.users.append(user)
+
+    def get_variables(self, rng, number):
+        # У каждого клиента свой пользователь: иначе сценарии, которые
+        # добавляют и удаляют одни и те же рецепты, мешают друг другу
+        user = self.users[number % len(self.users)]
+        others = [other for other in self.users if other is not user]
+        second, third = (
+            rng.sample(others, 2) if len(others) >= 2
+            else [rng.choice(others or self.users) for _ in range(2)]
+        )
+        first_ingredient, second_ingredient = rng.sample(self.ingredients,
+                                                         2)
+        variables = {
+            **self.base_variables,
+            'email': json.dumps(user['email']),
+            'username': json.dumps(user['username']),
+            'password': json.dumps(user['password']),
+            'userId': user['id'], 'userToken': user['token'],
+            'secondUserId': second['id'], 'secondUserToken': second['token'],
+            'thirdUserId': third['id'],
+            'firstIndredientId': first_ingredient['id'],
+            'secondIndredientId': second_ingredient['id'],
+            'ingredientNameFirstLatter': first_ingredient['name'][0],
+        }
+        variables.update(zip(RECIPE_VARIABLES, user['recipes']))
+        return variables
+
+    def run_client(self, number, delay, deadline, seed):
+        rng = random.Random(seed + number)
+        session = requests.Session()
+        sleep(delay)
+        while monotonic() < deadline:
+            name = rng.choices(self.names, weights=self.weights)[0]
+            variables = self.get_variables(rng, number)
+            for request in self.scenarios[name]:
+                self.send(session, request, variables)
+
+    def send(self, session, request, variables):
+        endpoint = (f'{request["method"]} '
+                    f'{request["url"].replace("{{baseUrl}}", "")}')
+        headers = get_auth_header(request['auth'], variables)
+        body = request['body']
+        if body:
+            headers['Content-Type'] = 'application/json'
+            body = substitute(body, variables).encode()
+        started = perf_counter()
+        try:
+            response = session.request(
+                request['method'], substitute(request['url'], variables),
+                data=body, headers=headers, timeout=30
+            )
+            failed = (response.status_code != request['expected']
+                      if request['expected']
+                      else response.status_code >= 400)
+        except requests.RequestException:
+            failed = True
+        elapsed = perf_counter() - started
+        with self.lock:
+            self.stats[endpoint].append(elapsed)
+            self.errors[endpoint] += failed
+
+    def report(self, elapsed, output):
+        total = sum(len(timings) for timings in self.stats.values())
+        errors = sum(self.errors.values())
+        endpoints = {}
+        for endpoint, timings in sorted(self.stats.items()):
+            percentiles = (quantiles(timings, n=100, method='inclusive')
+                           if len(timings) > 1 else timings * 99)
+            endpoints[endpoint] = {
+                'requests': len(timings),
+                'error_rate': round(self.errors[endpoint] / len(timings), 4),
+                'p50_ms': round(percentiles[49] * 1000, 1),
+                'p95_ms': round(percentiles[94] * 1000, 1),
+                'p99_ms': round(percentiles[98] * 1000, 1),
+            }
+            self.stdout.write(
+                f'{endpoint}: {len(timings)} запр., ошибок '
+                f'{endpoints[endpoint]["error_rate"]:.1%}, '
+                f'p50 {endpoints[endpoint]["p50_ms"]} мс, '
+                f'p95 {endpoints[endpoint]["p95_ms"]} мс, '
+                f'p99 {endpoints[endpoint]["p99_ms"]} мс'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Всего: {total} запросов за {elapsed:.0f} с, '
+            f'{total / elapsed:.1f} запр/с, ошибок {errors / (total or 1):.1%}'
+        ))
+        if output:
+            with open(output, 'w', encoding='utf-8') as file:
+                json.dump({'requests': total,
+                           'throughput': round(total / elapsed, 1),
+                           'error_rate': round(errors / (total or 1), 4),
+                           'endpoints': endpoints},
+                          file, ensure_ascii=False, indent=2, sort_keys=True)
@@ -0,0 +1,101 @@
+import json
+import logging
+import re
+from collections import Counter
+from time import perf_counter
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+PLACEHOLDER_LIST = re.compile(r'\(\s*%s(?:\s*,\s*%s)*\s*\)')
+LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+
+
+def get_fingerprint(sql):
+    """SQL без значений: одинаковые запросы с разными id совпадают."""
+    return LITERAL.sub('?', PLACEHOLDER_LIST.sub('(...)', sql))
+
+
+class QueryStats:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += perf_counter() - started
+            self.count += 1
+            self.fingerprints[get_fingerprint(sql)] += 1
+
+    def repeated(self):
+        return {
+            fingerprint: count
+            for fingerprint, count in self.fingerprints.most_common()
+            if count >= settings.SQL_REPEAT_THRESHOLD
+        }
+
+
+class SQLInstrumentationMiddleware:
+    """Считает SQL-запросы и время в базе для каждого запроса.
+
+    Добавляет заголовок Server-Timing и пишет строку JSON в лог, если
+    запрос вышел за бюджет по числу запросов или времени либо повторяет
+    один и тот же запрос (признак N+1). Подключается в settings.py только
+    при SQL_INSTRUMENTATION=true; асинхронные представления при этом
+    выполняются в синхронном режиме.
+
+    Тело потокового ответа формируется уже после выхода из представления,
+    поэтому его запросы учитываются при чтении streaming_content и попадают
+    в лог, но не в Server-Timing: заголовки к этому моменту отправлены.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = QueryStats()
+        started = perf_counter()
+        with connection.execute_wrapper(stats):
+            response = self.get_response(request)
+        duration = perf_counter() - started
+        response['Server-Timing'] = (
+            f'db;desc="{stats.count} queries";dur={stats.duration * 1000:.1f}'
+            f', total;dur={duration * 1000:.1f}'
+        )
+        if response.streaming and not response.is_async:
+            response.streaming_content = self.stream(
+                response.streaming_content, request, response, stats, started
+            )
+        else:
+            self.report(request, response, stats, duration)
+        return response
+
+    def stream(self, content, request, response, stats, started):
+        try:
+            with connection.execute_wrapper(stats):
+                yield from content
+        finally:
+            self.report(request, response, stats, perf_counter() - started)
+
+    @staticmethod
+    def report(request, response, stats, duration):
+        repeated = stats.repeated()
+        if (repeated or stats.count > settings.SQL_QUERY_BUDGET
+                or duration * 1000 > settings.SQL_LATENCY_BUDGET_MS):
+            match = request.resolver_match
+            logger.warning(json.dumps({
+                'view': match.view_name if match else None,
+                'method': request.method,
+                'path': request.get_full_path(),
+                'status': response.status_code,
+                'queries': stats.count,
+                'db_ms': round(stats.duration * 1000, 1),
+                'total_ms': round(duration * 1000, 1),
+                'repeated': repeated,
+            }, ensure_ascii=False))
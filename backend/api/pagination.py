@@ -1,9 +1,174 @@
-from rest_framework.pagination import LimitOffsetPagination
+from base64 import b64decode, b64encode
+from urllib import parse
 
-from .constants import PAGE_SIZE, MAX_PAGE_SIZE, LIMIT_QUERY_PARAM
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (Cursor, CursorPagination,
+                                       LimitOffsetPagination,
+                                       _reverse_ordering)
+from rest_framework.utils.urls import replace_query_param
+
+from .constants import (PAGE_SIZE, MAX_PAGE_SIZE, LIMIT_QUERY_PARAM,
+                        CURSOR_QUERY_PARAM, PAGINATION_QUERY_PARAM,
+                        CURSOR_PAGINATION)
+
+
+class KeysetPagination(CursorPagination):
+    """Курсорная пагинация по (-created_at, -id) или cursor_ordering вида.
+
+    В отличие от CursorPagination DRF, курсор хранит значения всех полей
+    сортировки, а страница начинается с условия
+    created_at < c OR (created_at = c AND id < i). Последнее поле
+    сортировки уникально, поэтому смещение не нужно: даже при множестве
+    одинаковых created_at каждая страница — просмотр индекса
+    (-created_at, -id) с позиции курсора.
+    """
+
+    page_size = PAGE_SIZE
+    page_size_query_param = LIMIT_QUERY_PARAM
+    max_page_size = MAX_PAGE_SIZE
+    cursor_query_param = CURSOR_QUERY_PARAM
+    ordering = ('-created_at', '-id')
+
+    def get_ordering(self, request, queryset, view):
+        return getattr(view, 'cursor_ordering', self.ordering)
+
+    def get_keyset_filter(self, position, reverse):
+        keyset_filter = Q()
+        equal = {}
+        for order, value in zip(self.ordering, position):
+            field = order.lstrip('-')
+            lookup = 'lt' if order.startswith('-') != reverse else 'gt'
+            keyset_filter |= Q(**equal, **{f'{field}__{lookup}': value})
+            equal[field] = value
+        return keyset_filter
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+        position = self.cursor.position if self.cursor else None
+        queryset = queryset.order_by(
+            *(_reverse_ordering(self.ordering) if reverse else self.ordering)
+        )
+        if position is not None:
+            try:
+                queryset = queryset.filter(
+                    self.get_keyset_filter(position, reverse)
+                )
+            except (ValidationError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_following = len(results) > len(self.page)
+        if reverse:
+            self.page.reverse()
+            self.has_next = position is not None
+            self.has_previous = has_following
+        else:
+            self.has_next = has_following
+            self.has_previous = position is not None
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def get_link(self, item, reverse):
+        position = (
+            self._get_position_from_instance(item, self.ordering)
+            if item is not None else self.cursor.position
+        )
+        return self.encode_cursor(
+            Cursor(offset=0, reverse=reverse, position=position)
+        )
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.get_link(self.page[-1] if self.page else None, False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.get_link(self.page[0] if self.page else None, True)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            tokens = parse.parse_qs(
+                b64decode(encoded.encode('ascii')).decode('ascii'),
+                keep_blank_values=True
+            )
+            reverse = bool(int(tokens.get('r', ['0'])[0]))
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        position = tokens.get('p')
+        if position is not None and len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return Cursor(offset=0, reverse=reverse,
+                      position=position and tuple(position))
+
+    def encode_cursor(self, cursor):
+        tokens = {'p': cursor.position}
+        if cursor.reverse:
+            tokens['r'] = '1'
+        encoded = b64encode(
+            parse.urlencode(tokens, doseq=True).encode('ascii')
+        ).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param,
+                                   encoded)
+
+    def _get_position_from_instance(self, instance, ordering):
+        return tuple(
+            str(instance[field] if isinstance(instance, dict)
+                else getattr(instance, field))
+            for field in (order.lstrip('-') for order in ordering)
+        )
+
+
+class FeedPagination(KeysetPagination):
+    ordering = ('-feed_created_at', '-id')
+
+    def get_ordering(self, request, queryset, view):
+        return self.ordering
 
 
 class PageToOffsetPagination(LimitOffsetPagination):
     page_size = PAGE_SIZE
     page_size_query_param = LIMIT_QUERY_PARAM
     max_page_size = MAX_PAGE_SIZE
+    keyset_pagination = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if (request.query_params.get(PAGINATION_QUERY_PARAM)
+                == CURSOR_PAGINATION
+                or CURSOR_QUERY_PARAM in request.query_params):
+            self.keyset_pagination = KeysetPagination()
+            return self.keyset_pagination.paginate_queryset(
+                queryset, request, view
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset_pagination:
+            return self.keyset_pagination.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    async def apaginate_queryset(self, queryset, request):
+        self.request = request
+        self.limit = self.get_limit(request)
+        self.count = await queryset.acount()
+        self.offset = self.get_offset(request)
+        if self.count == 0 or self.offset > self.count:
+            return []
+        return [
+            obj async for obj
+            in queryset[self.offset:self.offset + self.limit]
+        ]
@@ -0,0 +1,151 @@
+import heapq
+import threading
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter
+from datetime import timedelta
+from time import monotonic
+
+from django.db import transaction
+from django.db.models import Max
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from recipes.models import Ingredient, Recipe, RecipeIngredient
+from .cache import bump_version, get_version
+from .constants import (MATCH_CHANGES_OVERLAP, MATCH_CHECK_INTERVAL,
+                        MATCH_RESULTS_LIMIT)
+
+MATCH_VERSION_KEY = 'recipe_ingredient_index_version'
+
+
+class RecipeIngredientIndex:
+    """Обратный индекс «ингредиент → рецепты» в памяти процесса.
+
+    Для каждого ингредиента хранится отсортированный массив id рецептов,
+    для каждого рецепта — массив id его ингредиентов. Не чаще раза
+    в MATCH_CHECK_INTERVAL секунд индекс догружает рецепты, у которых
+    updated_at не старше прошлой сверки с запасом MATCH_CHANGES_OVERLAP
+    секунд на транзакции, закоммиченные позже. Это просмотр индекса
+    по updated_at, а правки ингредиентов сюда попадают через touch().
+    Строится заново индекс только при удалении рецепта или ингредиента:
+    об этом все процессы узнают по версии в общем кэше.
+    """
+
+    def __init__(self):
+        self.version = None
+        self.updated_at = None
+        self.checked_at = None
+        self.lock = threading.Lock()
+
+    def build(self):
+        self.postings = {}
+        self.recipes = {}
+        for recipe_id, ingredient_id in (
+            RecipeIngredient.objects
+            .order_by('recipe_id')
+            .values_list('recipe_id', 'ingredient_id')
+            .iterator()
+        ):
+            self.postings.setdefault(ingredient_id, array('q')).append(
+                recipe_id
+            )
+            self.recipes.setdefault(recipe_id, array('q')).append(
+                ingredient_id
+            )
+
+    def reload(self, recipe_ids):
+        for recipe_id in recipe_ids:
+            for ingredient_id in self.recipes.pop(recipe_id, ()):
+                posting = self.postings[ingredient_id]
+                del posting[bisect_left(posting, recipe_id)]
+        for recipe_id, ingredient_id in (
+            RecipeIngredient.objects
+            .filter(recipe_id__in=recipe_ids)
+            .values_list('recipe_id', 'ingredient_id')
+        ):
+            self.recipes.setdefault(recipe_id, array('q')).append(
+                ingredient_id
+            )
+            insort(self.postings.setdefault(ingredient_id, array('q')),
+                   recipe_id)
+
+    def get_changes(self):
+        """Рецепты, изменённые после прошлой сверки, с их updated_at."""
+        changes = Recipe.objects.values_list('id', 'updated_at')
+        if self.updated_at is not None:
+            changes = changes.filter(
+                updated_at__gte=(self.updated_at
+                                 - timedelta(seconds=MATCH_CHANGES_OVERLAP))
+            )
+        return list(changes)
+
+    def is_checked(self):
+        return (self.checked_at is not None
+                and monotonic() - self.checked_at < MATCH_CHECK_INTERVAL)
+
+    def ensure_fresh(self):
+        if self.is_checked():
+            return
+        with self.lock:
+            if not self.is_checked():
+                version = get_version(MATCH_VERSION_KEY)
+                if version != self.version:
+                    self.updated_at = Recipe.objects.aggregate(
+                        updated_at=Max('updated_at')
+                    )['updated_at']
+                    self.build()
+                    self.version = version
+                else:
+                    changes = self.get_changes()
+                    self.reload([recipe_id for recipe_id, _ in changes])
+                    self.updated_at = max(
+                        (updated_at for _, updated_at in changes),
+                        default=self.updated_at
+                    )
+                self.checked_at = monotonic()
+
+    def invalidate(self):
+        self.checked_at = None
+
+    def deleted(self):
+        bump_version(MATCH_VERSION_KEY)
+        self.invalidate()
+
+    def match(self, ingredient_ids, max_missing=0,
+              limit=MATCH_RESULTS_LIMIT):
+        """Id рецептов, которым не хватает не больше max_missing продуктов.
+
+        Рецепты упорядочены по доле имеющихся ингредиентов, затем
+        по числу недостающих, затем от новых к старым.
+        """
+        self.ensure_fresh()
+        matched = Counter()
+        with self.lock:
+            for ingredient_id in set(ingredient_ids):
+                matched.update(self.postings.get(ingredient_id, ()))
+            totals = {recipe_id: len(self.recipes[recipe_id])
+                      for recipe_id in matched}
+        ranked = (
+            (-count / totals[recipe_id], totals[recipe_id] - count,
+             -recipe_id)
+            for recipe_id, count in matched.items()
+            if totals[recipe_id] - count <= max_missing
+        )
+        return [-recipe_id for _, _, recipe_id
+                in heapq.nsmallest(limit, ranked)]
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(using, **kwargs):
+    # Свой процесс догружает рецепт сразу, остальные — по интервалу
+    transaction.on_commit(recipe_ingredient_index.invalidate, using=using)
+
+
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Ingredient)
+def catalog_deleted(using, **kwargs):
+    transaction.on_commit(recipe_ingredient_index.deleted, using=using)
+
+
+recipe_ingredient_index = RecipeIngredientIndex()
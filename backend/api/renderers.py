@@ -0,0 +1,11 @@
+from rest_framework.renderers import JSONRenderer
+
+
+class PlainTextRenderer(JSONRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+
+class CSVRenderer(JSONRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
@@ -1,17 +1,38 @@
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
-from drf_extra_fields.fields import Base64ImageField
 from djoser.serializers import UserSerializer
 
+from recipes.images import schedule_renditions
 from recipes.models import (Ingredient, Recipe, RecipeIngredient,
                             FavoriteRecipe, ShoppingCart, Subscription)
 from .constants import (MIN_COOKING_TIME, MAX_COOKING_TIME,
-                        MIN_INGREDIENT_AMOUNT, MAX_INGREDIENT_AMOUNT)
+                        MIN_INGREDIENT_AMOUNT, MAX_INGREDIENT_AMOUNT,
+                        RECIPES_LIMIT, MAX_RECIPES_LIMIT)
+from .fields import Base64ImageField
 
 User = get_user_model()
 
 
+def get_followed_author_ids(request):
+    if not hasattr(request, '_followed_author_ids'):
+        request._followed_author_ids = set(
+            request.user.followers.values_list('author_id', flat=True)
+        )
+    return request._followed_author_ids
+
+
+def get_recipes_limit(request):
+    try:
+        recipes_limit = int(request.query_params.get('recipes_limit',
+                                                     RECIPES_LIMIT))
+    except ValueError:
+        return RECIPES_LIMIT
+    return min(max(recipes_limit, 0), MAX_RECIPES_LIMIT)
+
+
 class UsersSerializer(UserSerializer):
     is_subscribed = serializers.SerializerMethodField()
     avatar = Base64ImageField(required=False, allow_null=True, default=None)
@@ -24,23 +45,31 @@ class UsersSerializer(UserSerializer):
         )
 
     def get_is_subscribed(self, author):
-        user = self.context['request'].user
+        request = self.context['request']
         return (
-            user.is_authenticated
-            and user.followers.filter(author=author).exists()
+            request.user.is_authenticated
+            and author.id in get_followed_author_ids(request)
         )
 
 
+class AvatarSerializer(serializers.ModelSerializer):
+    avatar = Base64ImageField(
+        error_messages={'required': 'Требуются данные для аватара.'}
+    )
+
+    class Meta:
+        model = User
+        fields = ('avatar',)
+
+
 class IngredientSerializer(serializers.ModelSerializer):
     class Meta:
-        fields = '__all__'
+        fields = ('id', 'name', 'measurement_unit')
         model = Ingredient
 
 
 class RecipeIngredientSerializer(serializers.ModelSerializer):
-    id = serializers.PrimaryKeyRelatedField(
-        queryset=Ingredient.objects.all(),
-    )
+    id = serializers.IntegerField(source='ingredient_id')
     name = serializers.CharField(
         source='ingredient.name',
         read_only=True
@@ -82,40 +111,109 @@ class RecipeSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(
                 'Необходимо добавить хотя бы один ингредиент.'
             )
-        ingredient_ids = [ingredient['id'] for ingredient in ingredients_data]
+        ingredient_ids = [
+            ingredient['ingredient_id'] for ingredient in ingredients_data
+        ]
         if len(ingredient_ids) != len(set(ingredient_ids)):
             raise serializers.ValidationError(
                 'Ингредиенты не могут повторяться.'
             )
-        self.validate_image(data.get('image'))
+        found = Ingredient.objects.in_bulk(ingredient_ids)
+        missing = [
+            str(ingredient_id) for ingredient_id in ingredient_ids
+            if ingredient_id not in found
+        ]
+        if missing:
+            raise serializers.ValidationError(
+                {'ingredients': 'Ингредиенты не найдены: '
+                                f'{", ".join(missing)}.'}
+            )
+        data['recipe_ingredients'] = [
+            {'ingredient': found[ingredient['ingredient_id']],
+             'amount': ingredient['amount']}
+            for ingredient in ingredients_data
+        ]
         return data
 
     def validate_image(self, image):
         if not image:
             raise serializers.ValidationError('Необходимо добавить фото.')
+        return image
 
     def save_ingredients(self, recipe, ingredients_data):
+        if not ingredients_data:
+            return
         RecipeIngredient.objects.bulk_create(
             RecipeIngredient(
                 recipe=recipe,
-                ingredient=ingredient['id'],
-                amount=ingredient.get('amount')
+                ingredient=ingredient['ingredient'],
+                amount=ingredient['amount']
             )
             for ingredient in ingredients_data
         )
 
+    def update_ingredients(self, recipe, ingredients_data):
+        current = {
+            recipe_ingredient.ingredient_id: recipe_ingredient
+            for recipe_ingredient in recipe.recipe_ingredients.all()
+        }
+        amounts = {
+            ingredient['ingredient'].id: ingredient['amount']
+            for ingredient in ingredients_data
+        }
+        changed = []
+        for ingredient_id, amount in amounts.items():
+            recipe_ingredient = current.get(ingredient_id)
+            if recipe_ingredient and recipe_ingredient.amount != amount:
+                recipe_ingredient.amount = amount
+                changed.append(recipe_ingredient)
+        removed = [
+            recipe_ingredient.id
+            for ingredient_id, recipe_ingredient in current.items()
+            if ingredient_id not in amounts
+        ]
+        if removed:
+            RecipeIngredient.objects.filter(id__in=removed).delete()
+        if changed:
+            RecipeIngredient.objects.bulk_update(changed, ['amount'])
+        self.save_ingredients(recipe, [
+            ingredient for ingredient in ingredients_data
+            if ingredient['ingredient'].id not in current
+        ])
+
+    @transaction.atomic
     def create(self, validated_data):
         ingredients_data = validated_data.pop('recipe_ingredients')
         recipe = super().create(validated_data)
         self.save_ingredients(recipe, ingredients_data)
+        Recipe.objects.filter(pk=recipe.pk).update_search_index()
+        schedule_renditions(recipe)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         ingredients_data = validated_data.pop('recipe_ingredients')
-        self.save_ingredients(instance, ingredients_data)
-        return super().update(instance, validated_data)
+        self.update_ingredients(instance, ingredients_data)
+        if 'image' in validated_data:
+            stale = (instance.image_thumbnail.name, instance.image_webp.name)
+            instance.image_thumbnail = instance.image_webp = ''
+            schedule_renditions(instance, stale)
+        recipe = super().update(instance, validated_data)
+        Recipe.objects.filter(pk=recipe.pk).update_search_index()
+        return recipe
+
+    def to_representation(self, recipe):
+        # После create и update ингредиенты не предвыбраны: грузим их
+        # одним запросом, а не по запросу на каждый ингредиент
+        prefetch_related_objects([recipe], Prefetch(
+            'recipe_ingredients',
+            queryset=RecipeIngredient.objects.select_related('ingredient')
+        ))
+        return super().to_representation(recipe)
 
     def get_is_favorited(self, recipe):
+        if hasattr(recipe, 'is_favorited'):
+            return recipe.is_favorited
         user = self.context['request'].user
         return (
             user.is_authenticated
@@ -123,20 +221,14 @@ class RecipeSerializer(serializers.ModelSerializer):
         )
 
     def get_is_in_shopping_cart(self, recipe):
+        if hasattr(recipe, 'is_in_shopping_cart'):
+            return recipe.is_in_shopping_cart
         user = self.context['request'].user
         return (
             user.is_authenticated
             and user.shoppingcart.filter(recipe=recipe).exists()
         )
 
-    def to_representation(self, instance):
-        representation = super().to_representation(instance)
-        is_favorited = self.get_is_favorited(instance)
-        is_in_shopping_cart = self.get_is_in_shopping_cart(instance)
-        representation['is_favorited'] = is_favorited
-        representation['is_in_shopping_cart'] = is_in_shopping_cart
-        return representation
-
 
 class SubscriptionSerializer(serializers.ModelSerializer):
     author = serializers.PrimaryKeyRelatedField(queryset=User.objects.all())
@@ -153,6 +245,13 @@ class SubscriptionSerializer(serializers.ModelSerializer):
             )
         return value
 
+    def create(self, validated_data):
+        subscription = super().create(validated_data)
+        request = self.context['request']
+        if hasattr(request, '_followed_author_ids'):
+            request._followed_author_ids.add(subscription.author_id)
+        return subscription
+
     def to_representation(self, instance):
         representation = super().to_representation(instance)
         author = instance.author
@@ -168,22 +267,24 @@ class SubscriptionDeleteSerializer(serializers.ModelSerializer):
         fields = ['author']
 
     def validate(self, attrs):
-        user = self.context['request'].user
+        request = self.context['request']
         author = attrs.get('author')
-        if not user.followers.filter(author=author).exists():
+        if author.id not in get_followed_author_ids(request):
             raise serializers.ValidationError(
                 'Вы не подписаны на этого пользователя.'
             )
         return attrs
 
     def save(self):
-        user = self.context['request'].user
+        request = self.context['request']
         author = self.validated_data['author']
-        subscription = user.followers.get(author=author)
-        subscription.delete()
+        request.user.followers.filter(author=author).delete()
+        get_followed_author_ids(request).discard(author.id)
 
 
 class SubscriptionRecipeSerializer(serializers.ModelSerializer):
+    image = serializers.ImageField(source='image_preview', read_only=True)
+
     class Meta:
         model = Recipe
         fields = ('id', 'name', 'image', 'cooking_time')
@@ -191,8 +292,7 @@ class SubscriptionRecipeSerializer(serializers.ModelSerializer):
 
 class UserWithRecipesSerializer(UsersSerializer):
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.IntegerField(
-        source='recipes.count', read_only=True)
+    recipes_count = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = User
@@ -201,11 +301,13 @@ class UserWithRecipesSerializer(UsersSerializer):
         )
 
     def get_recipes(self, obj):
-        request = self.context.get('request')
-        recipes_limit = request.query_params.get('recipes_limit', 10**10)
+        if hasattr(obj, 'limited_recipes'):
+            recipes = obj.limited_recipes
+        else:
+            recipes_limit = get_recipes_limit(self.context['request'])
+            recipes = obj.recipes.all()[:recipes_limit]
         return SubscriptionRecipeSerializer(
-            obj.recipes.all()[:int(recipes_limit)], many=True,
-            context=self.context).data
+            recipes, many=True, context=self.context).data
 
 
 class FavoriteRecipeSerializer(serializers.ModelSerializer):
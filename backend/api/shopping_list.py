@@ -0,0 +1,56 @@
+import csv
+import json
+
+from django.db.models import Sum
+
+from recipes.models import RecipeIngredient
+
+CHUNK_SIZE = 500
+
+
+def get_shopping_list(user):
+    return (
+        RecipeIngredient.objects
+        .filter(recipe__shoppingcart__user=user)
+        .values_list('ingredient__name', 'ingredient__measurement_unit')
+        .annotate(amount=Sum('amount'))
+        .order_by('ingredient__name', 'ingredient__measurement_unit')
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+
+
+def as_txt(rows):
+    yield 'Список покупок:\n\n'
+    for name, measurement_unit, amount in rows:
+        yield f'- {name}: {amount} {measurement_unit}\n'
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+def as_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(('Ингредиент', 'Единица измерения', 'Количество'))
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def as_json(rows):
+    separator = '['
+    for name, measurement_unit, amount in rows:
+        yield separator + json.dumps(
+            {'name': name, 'measurement_unit': measurement_unit,
+             'amount': amount},
+            ensure_ascii=False
+        )
+        separator = ','
+    yield '[]' if separator == '[' else ']'
+
+
+FORMATS = {
+    'txt': ('text/plain; charset=utf-8', as_txt),
+    'csv': ('text/csv; charset=utf-8', as_csv),
+    'json': ('application/json', as_json),
+}
@@ -1,6 +1,10 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
+from .async_views import (async_read_view, ingredient_detail,
+                          ingredient_list, recipe_detail, recipe_list,
+                          user_detail, user_me)
 from .views import IngredientViewSet, RecipeViewSet, UserViewSet
 from recipes.views import recipe_redirect_view
 
@@ -9,7 +13,26 @@ router.register('ingredients', IngredientViewSet, basename='ingredients')
 router.register('recipes', RecipeViewSet, basename='recipes')
 router.register('users', UserViewSet, basename='users')
 
-urlpatterns = [
+urlpatterns = []
+
+if settings.ASYNC_READS:
+    views = {url.name: url.callback for url in router.urls}
+    urlpatterns += [
+        path('ingredients/',
+             async_read_view(ingredient_list, views['ingredients-list'])),
+        path('ingredients/<int:pk>/',
+             async_read_view(ingredient_detail, views['ingredients-detail'])),
+        path('recipes/',
+             async_read_view(recipe_list, views['recipes-list'])),
+        path('recipes/<int:pk>/',
+             async_read_view(recipe_detail, views['recipes-detail'])),
+        path('users/me/',
+             async_read_view(user_me, views['users-me'])),
+        path('users/<int:id>/',
+             async_read_view(user_detail, views['users-detail'])),
+    ]
+
+urlpatterns += [
     path('', include(router.urls)),
     path('auth/', include('djoser.urls.authtoken')),
     path('s/<str:short_id>/', recipe_redirect_view, name='recipe_redirect'),
@@ -1,19 +1,16 @@
-import base64
-from collections import Counter
-
-from django.core.files.base import ContentFile
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.db.models import F, Prefetch, Window
+from django.db.models.functions import RowNumber
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.urls import reverse
+from django.utils.decorators import method_decorator
 from django_filters.rest_framework import DjangoFilterBackend
 
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
-from rest_framework.exceptions import ValidationError
-from rest_framework.filters import SearchFilter
-from rest_framework.permissions import (IsAuthenticated,
+from rest_framework.permissions import (IsAdminUser, IsAuthenticated,
                                         IsAuthenticatedOrReadOnly)
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
 
@@ -21,51 +18,87 @@ from djoser.views import UserViewSet as DjoserUserViewSet
 
 from recipes.models import (Ingredient, Recipe, FavoriteRecipe, ShoppingCart,
                             User)
+from .cache import AnonymousCacheMixin, get_cache_stats, invalidate_catalog
+from .conditional import ingredients_condition, recipe_condition
 from .filters import RecipeFilter
-from .pagination import PageToOffsetPagination
+from .ingredient_index import ingredient_index
+from .pagination import FeedPagination, PageToOffsetPagination
 from .permissions import IsAuthorOrReadOnly
-from .serializers import (IngredientSerializer, RecipeSerializer,
-                          UsersSerializer, UserWithRecipesSerializer,
+from .renderers import CSVRenderer, PlainTextRenderer
+from .shopping_list import FORMATS, get_shopping_list
+from .serializers import (AvatarSerializer, IngredientSerializer,
+                          RecipeSerializer, UsersSerializer,
+                          UserWithRecipesSerializer,
                           ShoppingCartSerializer, FavoriteRecipeSerializer,
                           SubscriptionSerializer, SubscriptionDeleteSerializer,
-                          SubscriptionRecipeSerializer)
+                          SubscriptionRecipeSerializer, get_recipes_limit)
 
 
 class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+    queryset = Ingredient.objects.order_by('name')
     serializer_class = IngredientSerializer
     pagination_class = None
-    filter_backends = (DjangoFilterBackend, SearchFilter,)
-    search_fields = ('^name',)
 
-    def get_queryset(self):
-        queryset = Ingredient.objects.all()
-        name = self.request.query_params.get('name', None)
+    @method_decorator(ingredients_condition)
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get('name')
         if name:
-            queryset = queryset.filter(name__icontains=name)
-        return queryset.order_by('name')
+            return Response(ingredient_index.search(name))
+        return super().list(request, *args, **kwargs)
 
 
-class RecipeViewSet(ModelViewSet):
-    queryset = Recipe.objects.select_related("author").all()
+class RecipeViewSet(AnonymousCacheMixin, ModelViewSet):
+    queryset = Recipe.objects.all()
     serializer_class = RecipeSerializer
     permission_classes = [IsAuthenticatedOrReadOnly, IsAuthorOrReadOnly]
     pagination_class = PageToOffsetPagination
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
 
+    def get_queryset(self):
+        user = self.request.user
+        return (
+            super().get_queryset()
+            .with_related()
+            .with_user_flags(user)
+        )
+
     def get_serializer_class(self):
         return RecipeSerializer
 
+    @method_decorator(recipe_condition)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         user = self.request.user
         serializer.save(author=user)
+        invalidate_catalog()
+
+    def perform_update(self, serializer):
+        serializer.save()
+        invalidate_catalog()
+
+    @action(detail=False, permission_classes=[IsAuthenticated],
+            pagination_class=FeedPagination)
+    def feed(self, request):
+        queryset = self.get_queryset().feed(request.user)
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=False, url_path='cache-stats',
+            permission_classes=[IsAdminUser])
+    def cache_stats(self, request):
+        return Response(get_cache_stats())
 
     @staticmethod
-    def handle_recipe_action(model, user, recipe, action_type,
+    def handle_recipe_action(model, request, recipe, action_type,
                              serializer_class):
+        user = request.user
         serializer = SubscriptionRecipeSerializer(
             recipe,
-            context={'request': user}
+            context={'request': request}
         )
         if action_type == 'add':
             action_serializer = serializer_class(data={'user': user.id,
@@ -87,26 +120,26 @@ class RecipeViewSet(ModelViewSet):
             permission_classes=[IsAuthenticated])
     def shopping_cart(self, request, pk=None):
         recipe = get_object_or_404(Recipe, pk=pk)
-        return self.handle_recipe_action(ShoppingCart, request.user, recipe,
+        return self.handle_recipe_action(ShoppingCart, request, recipe,
                                          'add', ShoppingCartSerializer)
 
     @shopping_cart.mapping.delete
     def remove_from_shopping_cart(self, request, pk=None):
         recipe = get_object_or_404(Recipe, pk=pk)
-        return self.handle_recipe_action(ShoppingCart, request.user, recipe,
+        return self.handle_recipe_action(ShoppingCart, request, recipe,
                                          'remove', ShoppingCartSerializer)
 
     @action(detail=True, methods=['post'],
             permission_classes=[IsAuthenticated])
     def favorite(self, request, pk=None):
         recipe = get_object_or_404(Recipe, pk=pk)
-        return self.handle_recipe_action(FavoriteRecipe, request.user, recipe,
+        return self.handle_recipe_action(FavoriteRecipe, request, recipe,
                                          'add', FavoriteRecipeSerializer)
 
     @favorite.mapping.delete
     def remove_from_favorites(self, request, pk=None):
         recipe = get_object_or_404(Recipe, pk=pk)
-        return self.handle_recipe_action(FavoriteRecipe, request.user, recipe,
+        return self.handle_recipe_action(FavoriteRecipe, request, recipe,
                                          'remove', FavoriteRecipeSerializer)
 
     @action(detail=True, methods=['get'], url_path='get-link')
@@ -116,42 +149,32 @@ class RecipeViewSet(ModelViewSet):
             reverse('recipe_redirect', args=[recipe.pk])
         )}, status=status.HTTP_200_OK)
 
-    @action(detail=False, permission_classes=[IsAuthenticated])
+    @action(detail=False, permission_classes=[IsAuthenticated],
+            renderer_classes=[PlainTextRenderer, CSVRenderer, JSONRenderer])
     def download_shopping_cart(self, request):
         user = request.user
-        shopping_cart = user.shoppingcart.all()
-        if not shopping_cart.exists():
+        if not user.shoppingcart.exists():
             return Response({'detail': 'Список покупок пуст.'},
-                            status=status.HTTP_200_OK)
+                            status=status.HTTP_200_OK,
+                            content_type='application/json')
 
-        shopping_list = self.generate_shopping_cart_text(shopping_cart)
-        response = HttpResponse(shopping_list, content_type='text/plain')
+        file_format = request.accepted_renderer.format
+        content_type, render = FORMATS[file_format]
+        response = StreamingHttpResponse(
+            render(get_shopping_list(user)), content_type=content_type
+        )
         response['Content-Disposition'] = (
-            'attachment; filename="shopping_list.txt"'
+            f'attachment; filename="shopping_list.{file_format}"'
         )
         return response
 
-    def generate_shopping_cart_text(self, shopping_cart):
-        ingredients_counter = Counter()
-        ingredients_data = (
-            Ingredient.objects
-            .filter(recipeingredient__recipe__shoppingcart__in=shopping_cart)
-            .annotate(amount_sum=Sum('recipeingredient__amount'))
-            .values('name', 'amount_sum')
-            .order_by('name')
-        )
-        for ingredient in ingredients_data:
-            ingredients_counter[ingredient['name']] += ingredient['amount_sum']
-        shopping_list = 'Список покупок:\n\n'
-        for ingredient_name, total_amount in ingredients_counter.items():
-            shopping_list += f'- {ingredient_name}: {total_amount} шт.\n'
-        return shopping_list
-
 
 class UserViewSet(DjoserUserViewSet):
     queryset = User.objects.all()
     serializer_class = UsersSerializer
     permission_classes = (IsAuthenticatedOrReadOnly,)
+    pagination_class = PageToOffsetPagination
+    cursor_ordering = ('username',)
 
     @action(detail=False, methods=['get'],
             permission_classes=[IsAuthenticated])
@@ -183,7 +206,19 @@ class UserViewSet(DjoserUserViewSet):
     @action(detail=False, methods=['get'],
             permission_classes=[IsAuthenticated])
     def subscriptions(self, request):
-        queryset = User.objects.filter(authors__user=request.user)
+        limited_recipes = Recipe.objects.annotate(
+            row_number=Window(
+                RowNumber(),
+                partition_by=F('author'),
+                order_by=(F('created_at').desc(), F('id').desc())
+            )
+        ).filter(row_number__lte=get_recipes_limit(request))
+        queryset = (
+            User.objects
+            .filter(authors__user=request.user)
+            .prefetch_related(Prefetch('recipes', queryset=limited_recipes,
+                                       to_attr='limited_recipes'))
+        )
         page = self.paginate_queryset(queryset)
         serializer = UserWithRecipesSerializer(page, many=True,
                                                context={'request': request})
@@ -194,26 +229,11 @@ class UserViewSet(DjoserUserViewSet):
     def avatar(self, request):
         user = request.user
         if request.method == 'PUT':
-            avatar_data = request.data.get('avatar')
-            if not avatar_data:
-                raise ValidationError('Требуются данные для аватара.')
-            try:
-                format, imgstr = avatar_data.split(';base64,')
-                ext = format.split('/')[-1]
-            except ValueError:
-                raise ValidationError(
-                    'Недопустимый формат аватара. Ожидаемое - base64.'
-                )
-            try:
-                avatar_file = ContentFile(base64.b64decode(imgstr),
-                                          name=f'avatar.{ext}')
-            except Exception as e:
-                raise ValidationError(f"Ошибка при загрузке аватара: {str(e)}")
+            serializer = AvatarSerializer(user, data=request.data)
+            serializer.is_valid(raise_exception=True)
             if user.avatar:
                 user.avatar.delete(save=False)
-
-            user.avatar = avatar_file
-            user.save()
+            serializer.save()
             return Response({'avatar': user.avatar.url})
         if user.avatar:
             user.avatar.delete(save=True)
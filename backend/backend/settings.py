@@ -83,6 +83,27 @@ else:
         }
     }
 
+# Версия каталога, кэш ответов и счётчики должны быть общими для всех
+# воркеров: по умолчанию кэш хранится в базе (таблицу создаёт миграция),
+# с REDIS_URL — в Redis. LocMemCache у каждого процесса свой
+REDIS_URL = os.getenv('REDIS_URL')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'django_cache',
+            'OPTIONS': {'MAX_ENTRIES': 100000},
+        }
+    }
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -115,6 +136,20 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Потоки для фоновой обработки изображений; 0 — обрабатывать в запросе
+IMAGE_WORKERS = int(os.getenv('IMAGE_WORKERS', 2))
+
+ASYNC_READS = os.getenv('ASYNC_READS', 'false').lower() == 'true'
+
+# Учёт SQL-запросов: заголовок Server-Timing и лог при выходе за бюджет
+SQL_INSTRUMENTATION = os.getenv('SQL_INSTRUMENTATION', 'false').lower() == 'true'
+SQL_QUERY_BUDGET = int(os.getenv('SQL_QUERY_BUDGET', 30))
+SQL_LATENCY_BUDGET_MS = int(os.getenv('SQL_LATENCY_BUDGET_MS', 500))
+SQL_REPEAT_THRESHOLD = int(os.getenv('SQL_REPEAT_THRESHOLD', 5))
+
+if SQL_INSTRUMENTATION:
+    MIDDLEWARE.insert(0, 'api.middleware.SQLInstrumentationMiddleware')
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 
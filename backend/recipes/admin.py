@@ -1,15 +1,63 @@
 from django.contrib import admin
+from django.contrib.admin.views.main import PAGE_VAR
 from django.utils.safestring import mark_safe
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Group
+from django.core.cache import cache
 
+from .constants import COOKING_TIME_BOUNDS_KEY, COOKING_TIME_BOUNDS_TIMEOUT
 from .models import (Ingredient, Recipe, Subscription, RecipeIngredient,
                      ShoppingCart)
 
 User = get_user_model()
 
 
+class InputFilter(admin.SimpleListFilter):
+    template = 'admin/input_filter.html'
+    lookup = None
+
+    def lookups(self, request, model_admin):
+        return ((None, None),)
+
+    def choices(self, changelist):
+        yield {
+            'selected': self.value() is None,
+            'query_string': changelist.get_query_string(
+                remove=[self.parameter_name]
+            ),
+            'parameter_name': self.parameter_name,
+            'value': self.value(),
+            'hidden_params': [
+                (name, value) for name, value in changelist.params.items()
+                if name not in (self.parameter_name, PAGE_VAR)
+            ],
+        }
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(**{self.lookup: self.value()})
+        return queryset
+
+
+class AuthorFilter(InputFilter):
+    title = 'автору'
+    parameter_name = 'author_username'
+    lookup = 'author__username__istartswith'
+
+
+class UserFilter(InputFilter):
+    title = 'пользователю'
+    parameter_name = 'user_username'
+    lookup = 'user__username__istartswith'
+
+
+class RecipeNameFilter(InputFilter):
+    title = 'рецепту'
+    parameter_name = 'recipe_name'
+    lookup = 'recipe__name__istartswith'
+
+
 @admin.register(User)
 class UserAdmin(BaseUserAdmin):
     list_display = ('id', 'username', 'get_full_name', 'email',
@@ -27,6 +75,7 @@ class UserAdmin(BaseUserAdmin):
     )
     ordering = ('username',)
     filter_horizontal = ('groups', 'user_permissions')
+    show_full_result_count = False
 
     @admin.display(description='ФИО')
     def get_full_name(self, user) -> str:
@@ -39,30 +88,27 @@ class UserAdmin(BaseUserAdmin):
                 'style="width: 40px; height: 40px; border-radius: 50%;">'
                 if user.avatar else '')
 
-    @admin.display(description='Количество рецептов')
+    @admin.display(description='Количество рецептов',
+                   ordering='recipes_count')
     def recipe_total(self, user) -> int:
-        return user.recipes_list.count()
-
-    @admin.display(description='Подписки')
-    def following_count(self, user) -> int:
-        return user.subscriptions.count()
-
-    @admin.display(description='Подписчики')
-    def followers_count(self, user) -> int:
-        return user.followers.count()
+        return user.recipes_count
 
 
 @admin.register(Subscription)
 class SubscriptionAdmin(admin.ModelAdmin):
     list_display = ('id', 'user', 'author')
     search_fields = ('user__username', 'author__username')
-    list_filter = ('user', 'author')
+    list_filter = (UserFilter, AuthorFilter)
+    list_select_related = ('user', 'author')
+    autocomplete_fields = ('user', 'author')
+    show_full_result_count = False
 
 
 class RecipeIngredientInline(admin.TabularInline):
     model = RecipeIngredient
     extra = 1
     min_num = 1
+    autocomplete_fields = ('ingredient',)
 
 
 @admin.register(Ingredient)
@@ -76,14 +122,20 @@ class CookingTimeCategory(admin.SimpleListFilter):
     title = 'Категории по времени'
     parameter_name = 'cooking_duration'
 
+    @staticmethod
+    def get_bounds():
+        bounds = cache.get(COOKING_TIME_BOUNDS_KEY)
+        if bounds is None:
+            bounds = Recipe.objects.cooking_time_tertiles()
+            cache.set(COOKING_TIME_BOUNDS_KEY, bounds,
+                      COOKING_TIME_BOUNDS_TIMEOUT)
+        return bounds
+
     def lookups(self, request, model_admin):
-        times = Recipe.objects.values_list('cooking_time', flat=True)
-        if not times:
+        self.bounds = self.get_bounds()
+        if not self.bounds:
             return []
-        sorted_times = sorted(set(times))
-        third = len(sorted_times) // 3
-        low = sorted_times[third]
-        mid = sorted_times[2 * third]
+        low, mid = self.bounds
 
         return [
             ('short', f'До {low} мин'),
@@ -92,12 +144,15 @@ class CookingTimeCategory(admin.SimpleListFilter):
         ]
 
     def queryset(self, request, queryset):
+        if not self.bounds:
+            return queryset
+        low, mid = self.bounds
         if self.value() == 'short':
-            return queryset.filter(cooking_time__lt=self.low)
+            return queryset.filter(cooking_time__lt=low)
         if self.value() == 'medium':
-            return queryset.filter(cooking_time__range=(self.low, self.mid))
+            return queryset.filter(cooking_time__range=(low, mid))
         if self.value() == 'long':
-            return queryset.filter(cooking_time__gt=self.mid)
+            return queryset.filter(cooking_time__gt=mid)
         return queryset
 
 
@@ -107,9 +162,19 @@ class RecipeAdmin(admin.ModelAdmin):
                     'get_favorite_count', 'show_ingredients_list',
                     'preview_image')
     search_fields = ('name', 'author__username')
-    list_filter = (CookingTimeCategory, 'author')
+    list_filter = (CookingTimeCategory, AuthorFilter)
     inlines = (RecipeIngredientInline,)
     readonly_fields = ('get_favorite_count',)
+    autocomplete_fields = ('author',)
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_related()
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        # Ингредиенты из инлайна записаны только теперь
+        Recipe.objects.filter(pk=form.instance.pk).update_search_index()
 
     @admin.display(description='Ингредиенты')
     @mark_safe
@@ -128,16 +193,19 @@ class RecipeAdmin(admin.ModelAdmin):
                 'style="border-radius: 8px;">'
                 if recipe.image else '')
 
-    @admin.display(description='В избранном')
+    @admin.display(description='В избранном', ordering='favorites_count')
     def get_favorite_count(self, recipe) -> int:
-        return recipe.favorites.count()
+        return recipe.favorites_count
 
 
 @admin.register(ShoppingCart)
 class ShoppingCartAdmin(admin.ModelAdmin):
     list_display = ('id', 'user', 'recipe')
     search_fields = ('user__username', 'recipe__name')
-    list_filter = ('user', 'recipe')
+    list_filter = (UserFilter, RecipeNameFilter)
+    list_select_related = ('user', 'recipe')
+    autocomplete_fields = ('user', 'recipe')
+    show_full_result_count = False
 
 
 try:
@@ -13,4 +13,24 @@ MAX_RECIPE_NAME_LENGTH = 256  # Длина для name в Recipe
 USERNAME_REGEX = r'^[\w.@+-]+$'
 
 # Максимальная длина отображаемых строк
-MAX_STR_LENGTH_FOR_DISPLAY = 30
\ No newline at end of file
+MAX_STR_LENGTH_FOR_DISPLAY = 30
+
+# Кэш границ фильтра по времени приготовления в админке
+COOKING_TIME_BOUNDS_KEY = 'cooking_time_bounds'
+COOKING_TIME_BOUNDS_TIMEOUT = 60 * 60  # Время жизни в кэше (в сек.)
+
+# Производные изображения рецептов: (поле, суффикс, размер, качество WebP)
+IMAGE_RENDITIONS = (
+    ('image_thumbnail', '_thumb', (320, 320), 75),
+    ('image_webp', '', (1280, 1280), 85),
+)
+
+# Полнотекстовый поиск рецептов
+SEARCH_CONFIG = 'russian'  # Конфигурация to_tsvector в PostgreSQL
+RECIPE_FTS_TABLE = 'recipes_recipe_fts'  # Таблица FTS5 в SQLite
+SEARCH_INDEX_CHUNK_SIZE = 500  # Рецептов за один запрос при обновлении
+
+# Лента рецептов авторов из подписок
+FEED_FANOUT_LIMIT = 5000  # Больше подписчиков — лента собирается при чтении
+FEED_BATCH_SIZE = 1000  # Записей ленты за один INSERT
+FEED_BACKFILL_SIZE = 50  # Рецептов автора в ленте сразу после подписки
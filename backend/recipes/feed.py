@@ -0,0 +1,59 @@
+from collections import defaultdict
+from itertools import islice
+
+from .constants import FEED_BACKFILL_SIZE, FEED_BATCH_SIZE, FEED_FANOUT_LIMIT
+from .models import FeedEntry, Recipe, Subscription, User
+
+
+def is_large_author(author_id):
+    return User.objects.filter(pk=author_id, feed_on_read=True).exists()
+
+
+def mark_large_author(author_id):
+    """Переводит автора на сборку ленты при чтении, когда подписчиков много."""
+    User.objects.filter(
+        pk=author_id, followers_count__gt=FEED_FANOUT_LIMIT,
+        feed_on_read=False
+    ).update(feed_on_read=True)
+
+
+def fan_out(recipes):
+    """Раскладывает новые рецепты по лентам подписчиков авторов пачками."""
+    by_author = defaultdict(list)
+    for recipe in recipes:
+        by_author[recipe.author_id].append(recipe)
+    entries = (
+        FeedEntry(user_id=user_id, recipe_id=recipe.id,
+                  created_at=recipe.created_at)
+        for author_id, user_id in (
+            Subscription.objects
+            .filter(author_id__in=by_author, author__feed_on_read=False)
+            .values_list('author_id', 'user_id')
+            .iterator(chunk_size=FEED_BATCH_SIZE)
+        )
+        for recipe in by_author[author_id]
+    )
+    while batch := list(islice(entries, FEED_BATCH_SIZE)):
+        FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту последние рецепты автора после подписки."""
+    if is_large_author(author_id):
+        return
+    FeedEntry.objects.bulk_create(
+        (FeedEntry(user_id=user_id, recipe_id=recipe_id,
+                   created_at=created_at)
+         for recipe_id, created_at in (
+             Recipe.objects
+             .filter(author_id=author_id)
+             .order_by('-created_at', '-id')
+             .values_list('id', 'created_at')[:FEED_BACKFILL_SIZE]
+        )),
+        ignore_conflicts=True
+    )
+
+
+def remove_author(user_id, author_id):
+    FeedEntry.objects.filter(user_id=user_id,
+                             recipe__author_id=author_id).delete()
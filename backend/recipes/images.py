@@ -0,0 +1,93 @@
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from PIL import Image
+
+from .constants import IMAGE_RENDITIONS
+from .models import Recipe
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=settings.IMAGE_WORKERS,
+                                       thread_name_prefix='recipe-images')
+    return _executor
+
+
+def render(image, size, quality):
+    rendition = image.copy()
+    if rendition.mode not in ('RGB', 'RGBA'):
+        rendition = rendition.convert(
+            'RGBA' if 'transparency' in rendition.info
+            or rendition.mode.endswith('A') else 'RGB'
+        )
+    rendition.thumbnail(size)
+    buffer = io.BytesIO()
+    rendition.save(buffer, 'WEBP', quality=quality)
+    return buffer.getvalue()
+
+
+def delete_files(storage, names):
+    for name in names:
+        if name:
+            storage.delete(name)
+
+
+def build_renditions(recipe_id, stale=()):
+    """Строит миниатюру и WebP и записывает их имена в рецепт.
+
+    Прежние версии (stale и текущие имена в рецепте) удаляются из
+    хранилища после того, как рецепт начал ссылаться на новые. Если
+    картинку за это время заменили, удаляются только что созданные файлы.
+    """
+    recipe = Recipe.objects.filter(pk=recipe_id).first()
+    if recipe is None or not recipe.image:
+        return
+    source_name = recipe.image.name
+    stale = {*stale, recipe.image_thumbnail.name, recipe.image_webp.name}
+    with recipe.image.open('rb') as file:
+        image = Image.open(file)
+        image.load()
+    storage = recipe.image.storage
+    stem = os.path.splitext(source_name)[0]
+    names = {}
+    for field, suffix, size, quality in IMAGE_RENDITIONS:
+        names[field] = storage.save(
+            f'{stem}{suffix}.webp',
+            ContentFile(render(image, size, quality))
+        )
+    if Recipe.objects.filter(pk=recipe_id, image=source_name).update(**names):
+        delete_files(storage, stale - set(names.values()))
+    else:
+        delete_files(storage, names.values())
+
+
+def build_renditions_in_background(recipe_id, stale):
+    close_old_connections()
+    try:
+        build_renditions(recipe_id, stale)
+    except Exception:
+        logger.exception('Не удалось обработать изображение рецепта %s',
+                         recipe_id)
+    finally:
+        close_old_connections()
+
+
+def schedule_renditions(recipe, stale=()):
+    """stale — имена прежних версий, которые удалить после замены."""
+    if settings.IMAGE_WORKERS:
+        transaction.on_commit(lambda: get_executor().submit(
+            build_renditions_in_background, recipe.pk, stale
+        ))
+    else:
+        transaction.on_commit(lambda: build_renditions(recipe.pk, stale))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from recipes.images import build_renditions
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Создаёт миниатюры и WebP-версии изображений рецептов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+                            help='Пересоздать для всех рецептов')
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.exclude(image='')
+        if not options['all']:
+            recipes = recipes.filter(image_thumbnail='')
+        built = 0
+        for recipe_id in recipes.values_list('id', flat=True).iterator():
+            build_renditions(recipe_id)
+            built += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано изображений: {built}.'
+        ))
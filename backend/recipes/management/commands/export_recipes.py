@@ -0,0 +1,79 @@
+import json
+import sys
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+
+from recipes.models import Recipe
+
+CHUNK_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = 'Выгружает рецепты с авторами и ингредиентами в формате NDJSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default='-',
+                            help='Файл для выгрузки (по умолчанию stdout)')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        recipes = (
+            Recipe.objects
+            .order_by('created_at', 'id')
+            .with_related()
+            .iterator(chunk_size=chunk_size)
+        )
+        if options['path'] == '-':
+            self.export(recipes, sys.stdout, chunk_size)
+        else:
+            with open(options['path'], 'w', encoding='utf-8') as output:
+                self.export(recipes, output, chunk_size)
+
+    def export(self, recipes, output, chunk_size):
+        started = perf_counter()
+        exported = 0
+        for recipe in recipes:
+            output.write(json.dumps(self.serialize(recipe),
+                                    ensure_ascii=False) + '\n')
+            exported += 1
+            if exported % chunk_size == 0:
+                self.report(exported, started)
+        self.report(exported, started)
+        self.stderr.write(self.style.SUCCESS(
+            f'Выгружено рецептов: {exported}.'
+        ))
+
+    def report(self, exported, started):
+        elapsed = perf_counter() - started
+        self.stderr.write(
+            f'{exported} рецептов, {exported / (elapsed or 1):.0f} в секунду'
+        )
+
+    @staticmethod
+    def serialize(recipe):
+        author = recipe.author
+        return {
+            'id': recipe.id,
+            'author': {
+                'email': author.email,
+                'username': author.username,
+                'first_name': author.first_name,
+                'last_name': author.last_name,
+            },
+            'name': recipe.name,
+            'text': recipe.text,
+            'created_at': recipe.created_at.isoformat(),
+            'cooking_time': recipe.cooking_time,
+            'image': recipe.image.name,
+            'ingredients': [
+                {
+                    'name': recipe_ingredient.ingredient.name,
+                    'measurement_unit':
+                        recipe_ingredient.ingredient.measurement_unit,
+                    'amount': recipe_ingredient.amount,
+                }
+                for recipe_ingredient in recipe.recipe_ingredients.all()
+            ],
+        }
@@ -0,0 +1,141 @@
+import random
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from faker import Faker
+
+from api.benchmark import EMAIL_DOMAIN
+from api.cache import invalidate_catalog
+from recipes.constants import COOKING_TIME_BOUNDS_KEY
+from recipes.feed import backfill
+from recipes.models import (FavoriteRecipe, Ingredient, Recipe,
+                            RecipeIngredient, ShoppingCart, Subscription,
+                            User)
+
+BATCH_SIZE = 1000
+BENCHMARK_PASSWORD = 'bench-password'
+
+
+class Command(BaseCommand):
+    help = ('Создаёт воспроизводимый синтетический набор данных: '
+            'пользователей, рецепты, подписки, избранное и списки покупок')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--recipes', type=int, default=5000)
+        parser.add_argument('--ingredients-per-recipe', type=int, nargs=2,
+                            default=[3, 15], metavar=('MIN', 'MAX'))
+        parser.add_argument('--follows-per-user', type=int, default=20)
+        parser.add_argument('--favorites-per-user', type=int, default=30)
+        parser.add_argument('--cart-per-user', type=int, default=10)
+        parser.add_argument('--clear', action='store_true',
+                            help='Удалить ранее созданные данные набора')
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.faker = Faker('ru_RU')
+        self.faker.seed_instance(options['seed'])
+        if options['clear']:
+            User.objects.filter(email__endswith=f'@{EMAIL_DOMAIN}').delete()
+        if not Ingredient.objects.exists():
+            call_command('load_ingredients', stdout=self.stderr)
+        with transaction.atomic():
+            user_ids = self.create_users(options['users'])
+            recipe_ids = self.create_recipes(
+                user_ids, options['recipes'],
+                *options['ingredients_per_recipe']
+            )
+            self.create_relations(Subscription, 'author', user_ids,
+                                  user_ids, options['follows_per_user'])
+            self.create_relations(FavoriteRecipe, 'recipe', user_ids,
+                                  recipe_ids, options['favorites_per_user'])
+            self.create_relations(ShoppingCart, 'recipe', user_ids,
+                                  recipe_ids, options['cart_per_user'])
+            for user_id, author_id in Subscription.objects.filter(
+                user_id__in=user_ids
+            ).values_list('user_id', 'author_id'):
+                backfill(user_id, author_id)
+        Recipe.objects.filter(pk__in=recipe_ids).update_search_index()
+        call_command('recalculate_counters', stdout=self.stderr)
+        invalidate_catalog()
+        cache.delete(COOKING_TIME_BOUNDS_KEY)
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано пользователей: {len(user_ids)}, '
+            f'рецептов: {len(recipe_ids)}. Пароль: {BENCHMARK_PASSWORD}'
+        ))
+
+    def create_users(self, count):
+        start = User.objects.filter(
+            email__endswith=f'@{EMAIL_DOMAIN}'
+        ).count()
+        password = make_password(BENCHMARK_PASSWORD)
+        users = [
+            User(email=f'user{number}@{EMAIL_DOMAIN}',
+                 username=f'bench_user{number}',
+                 first_name=self.faker.first_name(),
+                 last_name=self.faker.last_name(),
+                 password=password)
+            for number in range(start, start + count)
+        ]
+        User.objects.bulk_create(users, batch_size=BATCH_SIZE)
+        return list(User.objects.filter(
+            email__in=[user.email for user in users]
+        ).order_by('id').values_list('id', flat=True))
+
+    def create_recipes(self, author_ids, count, min_size, max_size):
+        ingredient_ids = list(
+            Ingredient.objects.order_by('id').values_list('id', flat=True)
+        )
+        # Популярность ингредиентов убывает как 1/ранг: соль и лук
+        # встречаются в рецептах гораздо чаще шафрана
+        self.random.shuffle(ingredient_ids)
+        weights = list(accumulate(
+            1 / rank for rank in range(1, len(ingredient_ids) + 1)
+        ))
+        recipe_ids = []
+        for offset in range(0, count, BATCH_SIZE):
+            recipes = Recipe.objects.bulk_create(
+                Recipe(author_id=self.random.choice(author_ids),
+                       name=self.faker.sentence(nb_words=3)[:-1],
+                       text=self.faker.paragraph(nb_sentences=5),
+                       cooking_time=self.random.randint(5, 180),
+                       image='recipes/images/benchmark.png')
+                for _ in range(min(BATCH_SIZE, count - offset))
+            )
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(recipe_id=recipe.id,
+                                 ingredient_id=ingredient_id,
+                                 amount=self.random.randint(1, 500))
+                for recipe in recipes
+                for ingredient_id in self.pick(
+                    ingredient_ids, weights,
+                    self.random.randint(min_size, max_size)
+                )
+            )
+            recipe_ids.extend(recipe.id for recipe in recipes)
+        return recipe_ids
+
+    def pick(self, population, cum_weights, count):
+        picked = set()
+        count = min(count, len(population))
+        while len(picked) < count:
+            picked.update(self.random.choices(
+                population, cum_weights=cum_weights, k=count - len(picked)
+            ))
+        return picked
+
+    def create_relations(self, model, field, user_ids, target_ids, count):
+        model.objects.bulk_create(
+            (model(user_id=user_id, **{f'{field}_id': target_id})
+             for user_id in user_ids
+             for target_id in self.random.sample(target_ids,
+                                                 min(count, len(target_ids)))
+             if target_id != user_id or field != 'author'),
+            batch_size=BATCH_SIZE,
+            ignore_conflicts=True
+        )
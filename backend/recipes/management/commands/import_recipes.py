@@ -0,0 +1,169 @@
+import csv
+import io
+import json
+import sys
+from itertools import islice
+from time import perf_counter
+
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils.dateparse import parse_datetime
+
+from api.cache import invalidate_catalog
+from recipes.constants import COOKING_TIME_BOUNDS_KEY
+from recipes.feed import fan_out
+from recipes.models import Ingredient, Recipe, RecipeIngredient, User
+
+CHUNK_SIZE = 1000
+
+
+def read_chunks(lines, chunk_size):
+    records = (json.loads(line) for line in lines if line.strip())
+    while chunk := list(islice(records, chunk_size)):
+        yield chunk
+
+
+class Command(BaseCommand):
+    help = ('Загружает рецепты из NDJSON, выгруженного командой '
+            'export_recipes')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default='-',
+                            help='Файл с рецептами (по умолчанию stdin)')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+        parser.add_argument('--no-copy', action='store_true',
+                            help='Не использовать COPY на PostgreSQL')
+        parser.add_argument('--fan-out', action='store_true',
+                            help='Разложить рецепты по лентам подписчиков')
+
+    def handle(self, *args, **options):
+        self.use_copy = (connection.vendor == 'postgresql'
+                         and not options['no_copy'])
+        self.fan_out = options['fan_out']
+        self.ingredient_ids = {}
+        self.imported = self.skipped = 0
+        if options['path'] == '-':
+            self.import_lines(sys.stdin, options['chunk_size'])
+        else:
+            with open(options['path'], encoding='utf-8') as source:
+                self.import_lines(source, options['chunk_size'])
+        call_command('recalculate_counters', stdout=self.stderr)
+        invalidate_catalog()
+        cache.delete(COOKING_TIME_BOUNDS_KEY)
+        self.stderr.write(self.style.SUCCESS(
+            f'Загружено рецептов: {self.imported}, '
+            f'пропущено: {self.skipped}.'
+        ))
+
+    def import_lines(self, lines, chunk_size):
+        started = perf_counter()
+        for chunk in read_chunks(lines, chunk_size):
+            with transaction.atomic():
+                self.import_chunk(chunk)
+            elapsed = perf_counter() - started
+            self.stderr.write(
+                f'{self.imported} рецептов, '
+                f'{self.imported / (elapsed or 1):.0f} в секунду'
+            )
+
+    def import_chunk(self, chunk):
+        authors = self.get_authors(chunk)
+        self.load_ingredients(chunk)
+        recipes, sources = [], []
+        for data in chunk:
+            author = authors.get(data['author']['email'])
+            if author is None:
+                self.skipped += 1
+                continue
+            recipes.append(Recipe(
+                author=author,
+                name=data['name'],
+                text=data['text'],
+                cooking_time=data['cooking_time'],
+                image=data['image'],
+            ))
+            sources.append(data)
+        Recipe.objects.bulk_create(recipes)
+        # auto_now_add перезаписывает created_at при вставке, а порядок
+        # рецептов в списке и лентах должен остаться как в выгрузке
+        restored = []
+        for recipe, data in zip(recipes, sources):
+            if data.get('created_at'):
+                recipe.created_at = parse_datetime(data['created_at'])
+                restored.append(recipe)
+        Recipe.objects.bulk_update(restored, ['created_at'])
+        rows = [
+            (recipe.id,
+             self.ingredient_ids[(ingredient['name'],
+                                  ingredient['measurement_unit'])],
+             ingredient['amount'])
+            for recipe, data in zip(recipes, sources)
+            for ingredient in data['ingredients']
+        ]
+        if self.use_copy:
+            self.copy_recipe_ingredients(rows)
+        else:
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(recipe_id=recipe_id,
+                                 ingredient_id=ingredient_id,
+                                 amount=amount)
+                for recipe_id, ingredient_id, amount in rows
+            )
+        Recipe.objects.filter(
+            pk__in=[recipe.id for recipe in recipes]
+        ).update_search_index()
+        if self.fan_out:
+            fan_out(recipes)
+        self.imported += len(recipes)
+
+    @staticmethod
+    def get_authors(chunk):
+        authors = {data['author']['email']: data['author'] for data in chunk}
+        existing = User.objects.in_bulk(authors, field_name='email')
+        missing = authors.keys() - existing.keys()
+        if missing:
+            User.objects.bulk_create(
+                (User(email=email,
+                      username=authors[email]['username'],
+                      first_name=authors[email]['first_name'],
+                      last_name=authors[email]['last_name'],
+                      password=make_password(None))
+                 for email in missing),
+                ignore_conflicts=True
+            )
+            existing.update(User.objects.in_bulk(missing, field_name='email'))
+        return existing
+
+    def load_ingredients(self, chunk):
+        missing = {
+            (ingredient['name'], ingredient['measurement_unit'])
+            for data in chunk for ingredient in data['ingredients']
+        } - self.ingredient_ids.keys()
+        if not missing:
+            return
+        Ingredient.objects.bulk_create(
+            (Ingredient(name=name, measurement_unit=measurement_unit)
+             for name, measurement_unit in missing),
+            ignore_conflicts=True
+        )
+        for ingredient_id, name, measurement_unit in (
+            Ingredient.objects
+            .filter(name__in={name for name, _ in missing})
+            .values_list('id', 'name', 'measurement_unit')
+        ):
+            self.ingredient_ids[(name, measurement_unit)] = ingredient_id
+
+    @staticmethod
+    def copy_recipe_ingredients(rows):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+        with connection.cursor() as cursor:
+            cursor.cursor.copy_expert(
+                f'COPY {RecipeIngredient._meta.db_table} '
+                '(recipe_id, ingredient_id, amount) FROM STDIN WITH CSV',
+                buffer
+            )
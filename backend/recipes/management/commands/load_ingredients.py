@@ -1,31 +1,131 @@
+import csv
 import json
-from django.core.management.base import BaseCommand
-from recipes.models import Ingredient
+from collections import defaultdict
+from itertools import islice
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from api.cache import invalidate_catalog
+from recipes.models import Ingredient, Recipe
+
+CHUNK_SIZE = 1000
+READ_SIZE = 64 * 1024
+JSON_SEPARATORS = ' \t\r\n,[]'
+
+
+def read_json(file):
+    decoder = json.JSONDecoder()
+    buffer = ''
+    for block in iter(lambda: file.read(READ_SIZE), ''):
+        buffer += block
+        position = 0
+        while True:
+            while (position < len(buffer)
+                   and buffer[position] in JSON_SEPARATORS):
+                position += 1
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                break
+            if not isinstance(item, dict):
+                raise CommandError('Ожидается массив объектов JSON.')
+            yield item['name'], item['measurement_unit']
+        buffer = buffer[position:]
+    if buffer.strip(JSON_SEPARATORS):
+        raise CommandError('Некорректный JSON в конце файла.')
+
+
+def read_csv(file):
+    for row in csv.reader(file):
+        if row and row != ['name', 'measurement_unit']:
+            yield row[0], row[1]
+
+
+READERS = {'.json': read_json, '.csv': read_csv}
 
 
 class Command(BaseCommand):
-    help = 'Загружает ингредиенты из JSON файла в базу данных'
+    help = 'Загружает ингредиенты из JSON или CSV файла в базу данных'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?',
+            default=Path(settings.BASE_DIR) / 'ingredients.json',
+            help='Файл .json или .csv (по умолчанию ingredients.json)'
+        )
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
 
-    def handle(self, *args, **kwargs):
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        reader = READERS.get(path.suffix.lower())
+        if reader is None:
+            raise CommandError('Поддерживаются только файлы .json и .csv.')
+        self.inserted = self.updated = self.skipped = 0
+        rows = self.read_rows(path, reader)
+        while chunk := list(islice(rows, options['chunk_size'])):
+            with transaction.atomic():
+                self.load_chunk(chunk)
+        if self.inserted or self.updated:
+            invalidate_catalog()
+        self.stdout.write(self.style.SUCCESS(
+            f'Добавлено: {self.inserted}, обновлено: {self.updated}, '
+            f'пропущено: {self.skipped}.'
+        ))
+
+    @staticmethod
+    def read_rows(path, reader):
+        # Ошибки load_chunk сюда не попадают: это не ошибки формата файла
         try:
-            with open('ingredients.json', 'r', encoding='utf-8') as file:
-                data = json.load(file)
-                created_ingredients = []
-                for item in data:
-                    ingredient = Ingredient(
-                        name=item['name'],
-                        measurement_unit=item['measurement_unit']
-                    )
-                    created_ingredients.append(ingredient)
-
-                Ingredient.objects.bulk_create(created_ingredients,
-                                               ignore_conflicts=True)
-
-            self.stdout.write(
-                self.style.SUCCESS(
-                    f'Успешно добавлено {len(created_ingredients)} '
-                    'ингредиентов.'
-                )
-            )
-        except Exception as e:
-            self.stderr.write(f'Произошла ошибка: {e}')
+            with open(path, encoding='utf-8') as file:
+                yield from reader(file)
+        except (OSError, KeyError, IndexError) as error:
+            raise CommandError(f'Не удалось прочитать {path}: {error!r}')
+
+    def load_chunk(self, rows):
+        """Добавляет новые пары (название, единица) и исправляет единицы.
+
+        Если у названия в базе ровно одна строка и ни одна единица этого
+        названия в пачке с ней не совпала, строка исправляется на последнюю
+        из них, остальные добавляются. Память зависит только от пачки.
+        """
+        distinct = dict.fromkeys(rows)
+        self.skipped += len(rows) - len(distinct)
+        chunk_units = defaultdict(set)
+        for name, measurement_unit in distinct:
+            chunk_units[name].add(measurement_unit)
+        existing = defaultdict(list)
+        for ingredient in Ingredient.objects.filter(name__in=chunk_units):
+            existing[ingredient.name].append(ingredient)
+        changed = []
+        for name, measurement_unit in dict(rows).items():
+            matches = existing[name]
+            if (len(matches) == 1
+                    and matches[0].measurement_unit not in chunk_units[name]):
+                matches[0].measurement_unit = measurement_unit
+                matches[0].updated_at = timezone.now()
+                changed.append(matches[0])
+        corrected = {(ingredient.name, ingredient.measurement_unit)
+                     for ingredient in changed}
+        new = []
+        for name, measurement_unit in distinct:
+            if any(ingredient.measurement_unit == measurement_unit
+                   for ingredient in existing[name]):
+                self.skipped += (name, measurement_unit) not in corrected
+            else:
+                new.append(Ingredient(name=name,
+                                      measurement_unit=measurement_unit))
+        Ingredient.objects.bulk_update(changed,
+                                       ['measurement_unit', 'updated_at'])
+        if changed:
+            # bulk_update не отправляет post_save, а единица измерения
+            # видна в рецептах: их updated_at (и ETag) обновляем сами
+            Recipe.objects.filter(
+                recipe_ingredients__ingredient__in=changed
+            ).touch()
+        Ingredient.objects.bulk_create(new, ignore_conflicts=True)
+        self.updated += len(changed)
+        self.inserted += len(new)
@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.models import (FavoriteRecipe, Recipe, ShoppingCart,
+                            Subscription, User)
+
+COUNTERS = (
+    (Recipe, 'favorites_count', FavoriteRecipe, 'recipe'),
+    (Recipe, 'shopping_cart_count', ShoppingCart, 'recipe'),
+    (User, 'recipes_count', Recipe, 'author'),
+    (User, 'followers_count', Subscription, 'author'),
+    (User, 'following_count', Subscription, 'user'),
+)
+
+
+def count_related(related_model, related_field):
+    return Coalesce(
+        Subquery(
+            related_model.objects
+            .filter(**{related_field: OuterRef('pk')})
+            .order_by()
+            .values(related_field)
+            .annotate(total=Count('pk'))
+            .values('total')
+        ),
+        0
+    )
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает счётчики избранного, списков покупок, '
+            'рецептов и подписок и исправляет расхождения')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Только показать количество расхождений')
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        for model, field, related_model, related_field in COUNTERS:
+            actual = count_related(related_model, related_field)
+            drifted = model.objects.exclude(**{field: actual})
+            if options['dry_run']:
+                fixed = drifted.count()
+            else:
+                fixed = drifted.update(**{field: actual})
+            self.stdout.write(
+                f'{model._meta.model_name}.{field}: '
+                f'расхождений — {fixed}'
+            )
+        self.stdout.write(self.style.SUCCESS('Счётчики проверены.'))
@@ -0,0 +1,61 @@
+# Generated by Django 4.2.18 on 2026-10-16 21:40
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+import recipes.models
+
+POSTGRESQL_FORWARD = (
+    "UPDATE recipes_recipe r SET search_vector = "
+    "setweight(to_tsvector('russian', r.name), 'A') "
+    "|| setweight(to_tsvector('russian', COALESCE(("
+    "SELECT string_agg(i.name, ' ') FROM recipes_recipeingredient ri "
+    "JOIN recipes_ingredient i ON i.id = ri.ingredient_id "
+    "WHERE ri.recipe_id = r.id), '')), 'B') "
+    "|| setweight(to_tsvector('russian', r.text), 'C')",
+)
+POSTGRESQL_BACKWARD = ()
+SQLITE_FORWARD = (
+    'CREATE VIRTUAL TABLE recipes_recipe_fts USING fts5('
+    "name, ingredients, text, tokenize = 'unicode61 remove_diacritics 2')",
+    'INSERT INTO recipes_recipe_fts (rowid, name, ingredients, text) '
+    "SELECT r.id, r.name, COALESCE(GROUP_CONCAT(i.name, ' '), ''), r.text "
+    'FROM recipes_recipe r '
+    'LEFT JOIN recipes_recipeingredient ri ON ri.recipe_id = r.id '
+    'LEFT JOIN recipes_ingredient i ON i.id = ri.ingredient_id '
+    'GROUP BY r.id',
+)
+SQLITE_BACKWARD = ('DROP TABLE IF EXISTS recipes_recipe_fts',)
+
+
+def run_for_vendor(postgresql, sqlite):
+    def run(apps, schema_editor):
+        statements = {'postgresql': postgresql, 'sqlite': sqlite}.get(
+            schema_editor.connection.vendor, ()
+        )
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0013_recipe_image_renditions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(
+            run_for_vendor(POSTGRESQL_FORWARD, SQLITE_FORWARD),
+            run_for_vendor(POSTGRESQL_BACKWARD, SQLITE_BACKWARD),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=recipes.models.SearchVectorIndex(fields=['search_vector'], name='recipe_search_vector_idx'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.18 on 2026-10-16 22:10
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+from recipes.constants import FEED_FANOUT_LIMIT
+
+# Раскладывает уже опубликованные рецепты по лентам подписчиков авторов,
+# у которых не больше FEED_FANOUT_LIMIT подписчиков
+BACKFILL_SQL = (
+    'INSERT INTO recipes_feedentry (user_id, recipe_id, created_at) '
+    'SELECT s.user_id, r.id, r.created_at '
+    'FROM recipes_subscription s '
+    'JOIN recipes_recipe r ON r.author_id = s.author_id '
+    'JOIN recipes_user u ON u.id = s.author_id '
+    'WHERE u.followers_count <= %s'
+)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0014_recipe_search_vector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(verbose_name='Дата публикации')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to='recipes.recipe', verbose_name='Рецепт')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to=settings.AUTH_USER_MODEL, verbose_name='Подписчик')),
+            ],
+            options={
+                'verbose_name': 'Запись ленты',
+                'verbose_name_plural': 'Записи ленты',
+                'ordering': ('-created_at', '-recipe'),
+                'indexes': [models.Index(fields=['user', '-created_at', '-recipe'], name='feed_user_created_at_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='feedentry',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_feed_entry'),
+        ),
+        migrations.RunSQL([(BACKFILL_SQL, [FEED_FANOUT_LIMIT])],
+                          migrations.RunSQL.noop),
+    ]
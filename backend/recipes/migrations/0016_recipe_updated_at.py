@@ -0,0 +1,24 @@
+# Generated by Django 4.2.18 on 2026-10-16 22:45
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0015_feedentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunSQL(
+            'UPDATE recipes_recipe SET updated_at = created_at',
+            migrations.RunSQL.noop
+        ),
+    ]
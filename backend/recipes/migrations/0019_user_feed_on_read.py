@@ -0,0 +1,26 @@
+# Generated by Django 4.2.18 on 2026-10-16 22:56
+
+from django.db import migrations, models
+
+from recipes.constants import FEED_FANOUT_LIMIT
+
+# Авторы, чьи рецепты 0015 не разложила по лентам
+MARK_SQL = ('UPDATE recipes_user SET feed_on_read = %s '
+            'WHERE followers_count > %s')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0018_create_cache_table'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='feed_on_read',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Лента собирается при чтении'),
+        ),
+        migrations.RunSQL([(MARK_SQL, [True, FEED_FANOUT_LIMIT])],
+                          migrations.RunSQL.noop),
+    ]
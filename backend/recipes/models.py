@@ -1,16 +1,64 @@
-from django.db import models
+import re
+from itertools import islice
+
+from django.db import connections, models, router, transaction
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce, RowNumber
 from django.conf import settings
 from django.core.validators import MinValueValidator, RegexValidator
 from django.contrib.auth.models import AbstractUser
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector, SearchVectorField)
+from django.utils import timezone
 
 from .constants import (MIN_COOKING_TIME, MIN_AMOUNT, MAX_EMAIL_LENGTH,
                         MAX_NAME_LENGTH, USERNAME_REGEX,
                         MAX_INGREDIENT_NAME_LENGTH,
                         MAX_MEASUREMENT_UNIT_LENGTH, MAX_RECIPE_NAME_LENGTH,
-                        MAX_STR_LENGTH_FOR_DISPLAY)
+                        MAX_STR_LENGTH_FOR_DISPLAY, RECIPE_FTS_TABLE,
+                        SEARCH_CONFIG, SEARCH_INDEX_CHUNK_SIZE)
+
+
+class DenormalizedFieldsMixin:
+    """Не перезаписывает счётчики при полном save().
+
+    Счётчики меняются в сигналах через F(), а экземпляр в памяти хранит
+    значения на момент загрузки, поэтому save() без update_fields
+    сохраняет все поля, кроме denormalized_fields. Счётчик записывается,
+    только если он явно указан в update_fields.
+    """
+
+    denormalized_fields = ()
+
+    def save(self, *args, **kwargs):
+        if (not self._state.adding and not args
+                and kwargs.get('update_fields') is None):
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.attname not in deferred
+                and field.name not in self.denormalized_fields
+            ]
+        super().save(*args, **kwargs)
 
 
-class User(AbstractUser):
+class AtomicSaveMixin:
+    """Сохраняет строку и обновляет счётчики в сигналах одной транзакцией.
+
+    post_delete и так вызывается внутри транзакции удаления.
+    """
+
+    def save(self, *args, **kwargs):
+        using = kwargs.get('using') or router.db_for_write(type(self),
+                                                           instance=self)
+        with transaction.atomic(using=using):
+            super().save(*args, **kwargs)
+
+
+class User(DenormalizedFieldsMixin, AbstractUser):
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']
@@ -48,6 +96,24 @@ class User(AbstractUser):
         verbose_name='Избранные рецепты',
         blank=True
     )
+    recipes_count = models.PositiveIntegerField(
+        'Количество рецептов', default=0, editable=False
+    )
+    followers_count = models.PositiveIntegerField(
+        'Количество подписчиков', default=0, editable=False
+    )
+    following_count = models.PositiveIntegerField(
+        'Количество подписок', default=0, editable=False
+    )
+    # Ставится, когда подписчиков становится больше FEED_FANOUT_LIMIT,
+    # и не снимается: рецепты автора с этого момента не раскладываются
+    # по лентам, и если бы флаг снимался, они пропали бы из лент
+    feed_on_read = models.BooleanField(
+        'Лента собирается при чтении', default=False, editable=False
+    )
+
+    denormalized_fields = ('recipes_count', 'followers_count',
+                           'following_count', 'feed_on_read')
 
     class Meta:
         verbose_name = 'Пользователь'
@@ -58,7 +124,7 @@ class User(AbstractUser):
         return self.username
 
 
-class Subscription(models.Model):
+class Subscription(AtomicSaveMixin, models.Model):
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
@@ -87,6 +153,19 @@ class Subscription(models.Model):
         return f'{self.user} подписан на {self.author}'
 
 
+class IngredientQuerySet(models.QuerySet):
+
+    def version(self):
+        """Число ингредиентов и время последнего изменения в базе.
+
+        Меняется при любом добавлении, удалении или правке ингредиента,
+        поэтому по нему все процессы узнают об изменении каталога.
+        """
+        state = self.aggregate(count=models.Count('id'),
+                               updated_at=models.Max('updated_at'))
+        return state['count'], state['updated_at']
+
+
 class Ingredient(models.Model):
     name = models.CharField(max_length=MAX_INGREDIENT_NAME_LENGTH,
                             verbose_name='Название',
@@ -96,6 +175,10 @@ class Ingredient(models.Model):
         verbose_name='Единица измерения',
         help_text='Введите единицу измерения ингредиента'
     )
+    # bulk_update не заполняет auto_now, поле передаётся явно
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = IngredientQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'ингредиент'
@@ -107,12 +190,216 @@ class Ingredient(models.Model):
                 name='unique_ingredient_measurement'
             )
         ]
+        indexes = [
+            models.Index(fields=['updated_at'],
+                         name='ingredient_updated_at_idx'),
+        ]
 
     def __str__(self):
         return self.name[:MAX_STR_LENGTH_FOR_DISPLAY]
 
 
-class Recipe(models.Model):
+class PercentileDisc(models.Aggregate):
+    function = 'PERCENTILE_DISC'
+    template = ('%(function)s(%(percentile)s) '
+                'WITHIN GROUP (ORDER BY %(expressions)s)')
+
+    def __init__(self, expression, percentile, **extra):
+        super().__init__(expression, percentile=float(percentile), **extra)
+
+
+class SearchVectorIndex(GinIndex):
+    """GIN-индекс по search_vector в PostgreSQL.
+
+    В SQLite поиск идёт по FTS5, а столбец не заполняется: там создаётся
+    обычный индекс, чтобы миграции были одни для обеих баз.
+    """
+
+    def create_sql(self, model, schema_editor, using='', **kwargs):
+        if schema_editor.connection.vendor != 'postgresql':
+            return models.Index.create_sql(self, model, schema_editor,
+                                           using=using, **kwargs)
+        return super().create_sql(model, schema_editor, using=using,
+                                  **kwargs)
+
+
+def delete_from_search_index(recipe_ids, using='default'):
+    """Удаляет рецепты из таблицы FTS5; в PostgreSQL индекс в самой строке."""
+    connection = connections[using]
+    if connection.vendor == 'postgresql' or not recipe_ids:
+        return
+    placeholders = ', '.join(['%s'] * len(recipe_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {RECIPE_FTS_TABLE} WHERE rowid IN ({placeholders})',
+            list(recipe_ids)
+        )
+
+
+class RecipeQuerySet(models.QuerySet):
+
+    def cooking_time_tertiles(self):
+        if connections[self.db].vendor == 'postgresql':
+            bounds = self.aggregate(
+                low=PercentileDisc('cooking_time', 1 / 3),
+                mid=PercentileDisc('cooking_time', 2 / 3)
+            )
+            if bounds['low'] is None:
+                return ()
+            return bounds['low'], bounds['mid']
+        # В SQLite нет PERCENTILE_DISC: те же позиции находим оконными
+        # функциями одним запросом
+        total = models.Window(models.Count('id'))
+        times = list(
+            self.annotate(
+                position=models.Window(RowNumber(), order_by='cooking_time'),
+                total=total
+            )
+            .filter(models.Q(position=(models.F('total') + 2) / 3)
+                    | models.Q(position=(2 * models.F('total') + 2) / 3))
+            .order_by('cooking_time')
+            .values_list('cooking_time', flat=True)
+        )
+        if not times:
+            return ()
+        return times[0], times[-1]
+
+    def search(self, query):
+        """Рецепты, подходящие под поисковую строку, по убыванию релевантности.
+
+        В PostgreSQL запрос идёт по столбцу search_vector с GIN-индексом,
+        в SQLite — по таблице FTS5 с префиксным поиском каждого слова.
+        """
+        if connections[self.db].vendor == 'postgresql':
+            search_query = SearchQuery(query, config=SEARCH_CONFIG,
+                                       search_type='websearch')
+            rank = SearchRank(models.F('search_vector'), search_query)
+            queryset = self.filter(search_vector=search_query)
+        else:
+            words = re.findall(r'\w+', query)
+            if not words:
+                return self.none()
+            match = ' '.join(f'"{word}"*' for word in words)
+            rank = RawSQL(
+                f'SELECT -bm25({RECIPE_FTS_TABLE}, 4.0, 2.0, 1.0) '
+                f'FROM {RECIPE_FTS_TABLE} WHERE {RECIPE_FTS_TABLE} '
+                f'MATCH %s AND rowid = {Recipe._meta.db_table}.id',
+                (match,)
+            )
+            queryset = self.filter(pk__in=RawSQL(
+                f'SELECT rowid FROM {RECIPE_FTS_TABLE} '
+                f'WHERE {RECIPE_FTS_TABLE} MATCH %s', (match,)
+            ))
+        return queryset.annotate(search_rank=rank).order_by(
+            '-search_rank', '-created_at', '-id'
+        )
+
+    def update_search_index(self):
+        """Пересобирает поисковый документ: название, ингредиенты, описание."""
+        if connections[self.db].vendor == 'postgresql':
+            ingredient_names = RecipeIngredient.objects.filter(
+                recipe=models.OuterRef('pk')
+            ).order_by().values('recipe').annotate(
+                names=StringAgg('ingredient__name', ' ')
+            ).values('names')
+            return self.update(search_vector=(
+                SearchVector('name', weight='A', config=SEARCH_CONFIG)
+                + SearchVector(
+                    Coalesce(models.Subquery(ingredient_names),
+                             models.Value('')),
+                    weight='B', config=SEARCH_CONFIG
+                )
+                + SearchVector('text', weight='C', config=SEARCH_CONFIG)
+            ))
+        recipe_ids = self.values_list('pk', flat=True).iterator()
+        updated = 0
+        with connections[self.db].cursor() as cursor:
+            while chunk := list(islice(recipe_ids, SEARCH_INDEX_CHUNK_SIZE)):
+                delete_from_search_index(chunk, using=self.db)
+                placeholders = ', '.join(['%s'] * len(chunk))
+                cursor.execute(
+                    f'INSERT INTO {RECIPE_FTS_TABLE} '
+                    '(rowid, name, ingredients, text) '
+                    'SELECT r.id, r.name, '
+                    "COALESCE(GROUP_CONCAT(i.name, ' '), ''), r.text "
+                    f'FROM {Recipe._meta.db_table} r '
+                    f'LEFT JOIN {RecipeIngredient._meta.db_table} ri '
+                    'ON ri.recipe_id = r.id '
+                    f'LEFT JOIN {Ingredient._meta.db_table} i '
+                    'ON i.id = ri.ingredient_id '
+                    f'WHERE r.id IN ({placeholders}) GROUP BY r.id', chunk
+                )
+                updated += len(chunk)
+        return updated
+
+    def touch(self, reindex=False):
+        """Обновляет updated_at (и поисковый документ) пачками.
+
+        Нужен, когда меняются связанные с рецептами данные, например
+        ингредиенты: ETag рецепта и индекс ?have= смотрят на updated_at.
+        Каждая пачка — отдельный короткий UPDATE, без долгих блокировок.
+        """
+        recipe_ids = iter(list(
+            self.order_by().values_list('pk', flat=True).distinct()
+        ))
+        while chunk := list(islice(recipe_ids, SEARCH_INDEX_CHUNK_SIZE)):
+            recipes = Recipe.objects.using(self.db).filter(pk__in=chunk)
+            recipes.update(updated_at=timezone.now())
+            if reindex:
+                recipes.update_search_index()
+
+    def feed(self, user):
+        """Рецепты авторов из подписок пользователя с полем feed_created_at.
+
+        Обычно это один просмотр индекса ленты пользователя. Рецепты
+        авторов, у которых хоть раз было больше FEED_FANOUT_LIMIT
+        подписчиков (feed_on_read), в ленты не раскладываются
+        и добавляются при чтении.
+        """
+        large_author_ids = list(
+            user.followers
+            .filter(author__feed_on_read=True)
+            .values_list('author_id', flat=True)
+        )
+        if not large_author_ids:
+            return self.filter(feed_entries__user=user).annotate(
+                feed_created_at=models.F('feed_entries__created_at')
+            )
+        return self.filter(
+            models.Q(pk__in=FeedEntry.objects.filter(user=user)
+                     .values('recipe_id'))
+            | models.Q(author_id__in=large_author_ids)
+        ).annotate(feed_created_at=models.F('created_at'))
+
+    def with_related(self):
+        return self.select_related('author').prefetch_related(
+            models.Prefetch(
+                'recipe_ingredients',
+                queryset=RecipeIngredient.objects.select_related('ingredient')
+            )
+        )
+
+    def with_user_flags(self, user):
+        if not user.is_authenticated:
+            return self.annotate(
+                is_favorited=models.Value(False),
+                is_in_shopping_cart=models.Value(False)
+            )
+        return self.annotate(
+            is_favorited=models.Exists(
+                FavoriteRecipe.objects.filter(
+                    user=user, recipe=models.OuterRef('pk')
+                )
+            ),
+            is_in_shopping_cart=models.Exists(
+                ShoppingCart.objects.filter(
+                    user=user, recipe=models.OuterRef('pk')
+                )
+            )
+        )
+
+
+class Recipe(AtomicSaveMixin, DenormalizedFieldsMixin, models.Model):
     author = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
@@ -121,7 +408,15 @@ class Recipe(models.Model):
     )
     name = models.CharField('Название', max_length=MAX_RECIPE_NAME_LENGTH)
     image = models.ImageField('Картинка', upload_to='recipes/images/')
+    image_thumbnail = models.ImageField(
+        'Миниатюра', upload_to='recipes/images/', blank=True, editable=False
+    )
+    image_webp = models.ImageField(
+        'Картинка WebP', upload_to='recipes/images/', blank=True,
+        editable=False
+    )
     text = models.TextField('Описание')
+    search_vector = SearchVectorField(null=True, editable=False)
     ingredients = models.ManyToManyField(
         Ingredient,
         through='RecipeIngredient',
@@ -134,15 +429,44 @@ class Recipe(models.Model):
         validators=(MinValueValidator(MIN_COOKING_TIME),)
     )
     created_at = models.DateTimeField(auto_now_add=True)
+    # Обновляется и при изменении ингредиентов: сериализатор сохраняет
+    # рецепт после них, переименование ингредиента обновляет поле в сигнале
+    updated_at = models.DateTimeField(auto_now=True)
+    favorites_count = models.PositiveIntegerField(
+        'В избранном', default=0, editable=False
+    )
+    shopping_cart_count = models.PositiveIntegerField(
+        'В списках покупок', default=0, editable=False
+    )
+
+    denormalized_fields = ('favorites_count', 'shopping_cart_count')
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'],
+                         name='recipe_created_at_id_idx'),
+            models.Index(fields=['author', '-created_at', '-id'],
+                         name='recipe_author_created_at_idx'),
+            models.Index(fields=['cooking_time'],
+                         name='recipe_cooking_time_idx'),
+            models.Index(fields=['updated_at'],
+                         name='recipe_updated_at_idx'),
+            SearchVectorIndex(fields=['search_vector'],
+                              name='recipe_search_vector_idx'),
+        ]
 
     def __str__(self):
         return self.name[:MAX_STR_LENGTH_FOR_DISPLAY]
 
+    @property
+    def image_preview(self):
+        return self.image_thumbnail or self.image
+
 
 class RecipeIngredient(models.Model):
     recipe = models.ForeignKey(
@@ -180,7 +504,44 @@ class RecipeIngredient(models.Model):
         )
 
 
-class BaseUserRecipeModel(models.Model):
+class FeedEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        related_name='feed_entries',
+        on_delete=models.CASCADE,
+        verbose_name='Подписчик'
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        related_name='feed_entries',
+        on_delete=models.CASCADE,
+        verbose_name='Рецепт'
+    )
+    created_at = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='unique_feed_entry'
+            )
+        ]
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-recipe'],
+                         name='feed_user_created_at_idx'),
+        ]
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        ordering = ('-created_at', '-recipe')
+
+    def __str__(self):
+        return (
+            f'{self.user.username[:MAX_STR_LENGTH_FOR_DISPLAY]}: '
+            f'{self.recipe.name[:MAX_STR_LENGTH_FOR_DISPLAY]}'
+        )
+
+
+class BaseUserRecipeModel(AtomicSaveMixin, models.Model):
     user = models.ForeignKey(
         User,
         related_name='%(class)s',
@@ -0,0 +1,90 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .constants import COOKING_TIME_BOUNDS_KEY
+from .feed import backfill, fan_out, mark_large_author, remove_author
+from .models import (FavoriteRecipe, Ingredient, Recipe, ShoppingCart,
+                     Subscription, User, delete_from_search_index)
+
+
+def change_counter(model, pk, field, delta):
+    # Вызывается из сигналов внутри транзакции сохранения или удаления
+    # строки (AtomicSaveMixin), поэтому счётчик не расходится с ней
+    value = F(field) + delta
+    if delta < 0:
+        value = Greatest(value, 0)
+    model.objects.filter(pk=pk).update(**{field: value})
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(instance, created, using, **kwargs):
+    cache.delete(COOKING_TIME_BOUNDS_KEY)
+    if created:
+        change_counter(User, instance.author_id, 'recipes_count', 1)
+        transaction.on_commit(lambda: fan_out([instance]), using=using)
+    # Название и описание индексируются сразу; ингредиенты пишутся позже,
+    # поэтому после них update_search_index вызывают сериализатор, админка
+    # и import_recipes
+    Recipe.objects.using(using).filter(pk=instance.pk).update_search_index()
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(instance, using, **kwargs):
+    cache.delete(COOKING_TIME_BOUNDS_KEY)
+    change_counter(User, instance.author_id, 'recipes_count', -1)
+    delete_from_search_index([instance.pk], using=using)
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_saved(instance, created, using, **kwargs):
+    # Рецептов с ингредиентом могут быть тысячи: обновляем их пачками
+    # после коммита, не удерживая транзакцию сохранения
+    if not created:
+        transaction.on_commit(
+            lambda: Recipe.objects.using(using).filter(
+                recipe_ingredients__ingredient=instance
+            ).touch(reindex=True),
+            using=using
+        )
+
+
+@receiver(post_save, sender=FavoriteRecipe)
+def favorite_created(instance, created, **kwargs):
+    if created:
+        change_counter(Recipe, instance.recipe_id, 'favorites_count', 1)
+
+
+@receiver(post_delete, sender=FavoriteRecipe)
+def favorite_deleted(instance, **kwargs):
+    change_counter(Recipe, instance.recipe_id, 'favorites_count', -1)
+
+
+@receiver(post_save, sender=ShoppingCart)
+def shopping_cart_created(instance, created, **kwargs):
+    if created:
+        change_counter(Recipe, instance.recipe_id, 'shopping_cart_count', 1)
+
+
+@receiver(post_delete, sender=ShoppingCart)
+def shopping_cart_deleted(instance, **kwargs):
+    change_counter(Recipe, instance.recipe_id, 'shopping_cart_count', -1)
+
+
+@receiver(post_save, sender=Subscription)
+def subscription_created(instance, created, **kwargs):
+    if created:
+        change_counter(User, instance.author_id, 'followers_count', 1)
+        change_counter(User, instance.user_id, 'following_count', 1)
+        mark_large_author(instance.author_id)
+        backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Subscription)
+def subscription_deleted(instance, **kwargs):
+    change_counter(User, instance.author_id, 'followers_count', -1)
+    change_counter(User, instance.user_id, 'following_count', -1)
+    remove_author(instance.user_id, instance.author_id)
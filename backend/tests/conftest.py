@@ -0,0 +1,56 @@
+import pytest
+from rest_framework.test import APIClient
+
+from api.ingredient_index import ingredient_index
+from api.recipe_index import recipe_ingredient_index
+from recipes.models import Ingredient, Recipe, RecipeIngredient, User
+
+RECIPES_COUNT = 8
+
+
+@pytest.fixture(autouse=True)
+def fresh_indexes():
+    # Индексы живут в памяти процесса и не видят откат транзакции
+    # теста, поэтому каждый тест начинает с пустых
+    ingredient_index.__init__()
+    recipe_ingredient_index.__init__()
+
+
+@pytest.fixture
+def user(db):
+    return User.objects.create_user(
+        email='reader@example.com', username='reader', password='password',
+        first_name='Читатель', last_name='Тестов'
+    )
+
+
+@pytest.fixture
+def user_client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+@pytest.fixture
+def recipes(db):
+    authors = User.objects.bulk_create(
+        User(email=f'author{number}@example.com',
+             username=f'author{number}',
+             first_name='Автор', last_name=str(number))
+        for number in range(RECIPES_COUNT)
+    )
+    ingredients = Ingredient.objects.bulk_create(
+        Ingredient(name=f'Продукт {number}', measurement_unit='г')
+        for number in range(3)
+    )
+    recipes = Recipe.objects.bulk_create(
+        Recipe(author=author, name=f'Рецепт {number}', text='Описание',
+               cooking_time=10, image='recipes/images/test.png')
+        for number, author in enumerate(authors)
+    )
+    RecipeIngredient.objects.bulk_create(
+        RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=1)
+        for recipe in recipes
+        for ingredient in ingredients
+    )
+    return recipes
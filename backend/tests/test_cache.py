@@ -0,0 +1,24 @@
+from django.core.cache import cache
+from rest_framework.test import APIClient
+
+from api.cache import CATALOG_VERSION_KEY, get_cache_stats
+
+
+def test_evicted_catalog_version_does_not_revive_old_responses(recipes):
+    client = APIClient()
+    assert client.get('/api/recipes/')['X-Cache'] == 'MISS'
+    assert client.get('/api/recipes/')['X-Cache'] == 'HIT'
+    cache.delete(CATALOG_VERSION_KEY)
+    assert client.get('/api/recipes/')['X-Cache'] == 'MISS'
+
+
+def test_cache_hits_are_counted_without_cache_writes(
+    recipes, django_assert_num_queries
+):
+    client = APIClient()
+    client.get('/api/recipes/')
+    hits = get_cache_stats()['hits']
+    # Версия каталога и сам ответ, без записи счётчиков в кэш
+    with django_assert_num_queries(2):
+        assert client.get('/api/recipes/')['X-Cache'] == 'HIT'
+    assert get_cache_stats()['hits'] == hits + 1
@@ -0,0 +1,76 @@
+from functools import partial
+from io import StringIO
+
+from asgiref.sync import async_to_sync
+from django.core.management import call_command
+from django.test import RequestFactory
+from rest_framework.authtoken.models import Token
+
+from api.async_views import ingredient_list, recipe_detail
+from recipes.models import Ingredient, ShoppingCart
+
+
+def test_recipe_etag_changes_when_unit_is_corrected(
+    user_client, recipes, tmp_path, django_capture_on_commit_callbacks
+):
+    url = f'/api/recipes/{recipes[0].id}/'
+    etag = user_client.get(url)['ETag']
+    assert user_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+    ingredient = Ingredient.objects.order_by('id').first()
+    path = tmp_path / 'ingredients.csv'
+    path.write_text(f'{ingredient.name},кг\n', encoding='utf-8')
+    call_command('load_ingredients', path, stdout=StringIO())
+    response = user_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response['ETag'] != etag
+    etag = response['ETag']
+    ingredient.refresh_from_db()
+    ingredient.name = 'Переименованный'
+    with django_capture_on_commit_callbacks(execute=True):
+        ingredient.save()
+    assert user_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+
+def assert_plain_not_modified(get):
+    response = get()
+    assert response.status_code == 200
+    etag = response['ETag']
+    response = get(HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    assert response.content == b''
+    assert response['ETag'] == etag
+    assert get(HTTP_IF_NONE_MATCH='"old"').status_code == 200
+
+
+def test_matching_etag_gets_plain_not_modified(user_client, recipes):
+    for url in (f'/api/recipes/{recipes[0].id}/', '/api/ingredients/'):
+        assert_plain_not_modified(partial(user_client.get, url))
+
+
+def test_async_views_answer_matching_etag_with_not_modified(user, recipes):
+    token = Token.objects.create(user=user)
+    factory = RequestFactory(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+    def get(view, url, **headers):
+        return async_to_sync(view)(factory.get(url, **headers))
+
+    assert_plain_not_modified(partial(get, ingredient_list,
+                                      '/api/ingredients/'))
+    recipe_id = recipes[0].id
+
+    def get_recipe(**headers):
+        return async_to_sync(recipe_detail)(
+            factory.get(f'/api/recipes/{recipe_id}/', **headers),
+            pk=recipe_id
+        )
+
+    assert_plain_not_modified(get_recipe)
+
+
+def test_recipe_etag_depends_on_user_flags(user, user_client, recipes):
+    url = f'/api/recipes/{recipes[0].id}/'
+    etag = user_client.get(url)['ETag']
+    ShoppingCart.objects.create(user=user, recipe=recipes[0])
+    response = user_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response.data['is_in_shopping_cart'] is True
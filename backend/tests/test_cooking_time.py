@@ -0,0 +1,11 @@
+from recipes.models import Recipe
+
+
+def test_cooking_time_tertiles_take_one_query(
+    recipes, django_assert_num_queries
+):
+    for cooking_time, recipe in enumerate(recipes, start=1):
+        Recipe.objects.filter(pk=recipe.pk).update(cooking_time=cooking_time)
+    with django_assert_num_queries(1):
+        assert Recipe.objects.cooking_time_tertiles() == (3, 6)
+    assert Recipe.objects.none().cooking_time_tertiles() == ()
@@ -0,0 +1,19 @@
+from recipes.models import FavoriteRecipe, Recipe, Subscription, User
+
+
+def test_full_save_keeps_counters(user, recipes):
+    recipe = Recipe.objects.get(pk=recipes[0].pk)
+    author = User.objects.get(pk=recipe.author_id)
+    FavoriteRecipe.objects.create(user=user, recipe=recipe)
+    Subscription.objects.create(user=user, author=author)
+    # Экземпляры загружены до изменения счётчиков
+    recipe.name = 'Новое название'
+    recipe.save()
+    author.first_name = 'Новое имя'
+    author.save()
+    recipe.refresh_from_db()
+    author.refresh_from_db()
+    assert recipe.name == 'Новое название'
+    assert recipe.favorites_count == 1
+    assert author.first_name == 'Новое имя'
+    assert author.followers_count == 1
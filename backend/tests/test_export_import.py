@@ -0,0 +1,27 @@
+from datetime import datetime, timezone
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from recipes.models import FeedEntry, Recipe, Subscription
+
+
+@pytest.mark.parametrize('fan_out', [False, True])
+def test_import_keeps_created_at_and_fans_out_on_request(
+    user, recipes, tmp_path, fan_out
+):
+    created_at = datetime(2020, 5, 1, 12, 30, tzinfo=timezone.utc)
+    Recipe.objects.filter(pk=recipes[0].pk).update(created_at=created_at)
+    path = tmp_path / 'recipes.ndjson'
+    call_command('export_recipes', path, stderr=StringIO())
+    Recipe.objects.all().delete()
+    Subscription.objects.create(user=user, author=recipes[0].author)
+    options = ['--fan-out'] if fan_out else []
+    call_command('import_recipes', path, '--no-copy', *options,
+                 stdout=StringIO(), stderr=StringIO())
+    assert Recipe.objects.count() == len(recipes)
+    imported = Recipe.objects.get(name=recipes[0].name)
+    assert imported.created_at == created_at
+    assert Recipe.objects.order_by('created_at').first() == imported
+    assert FeedEntry.objects.filter(user=user).exists() == fan_out
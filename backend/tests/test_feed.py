@@ -0,0 +1,22 @@
+from recipes import feed
+from recipes.models import Recipe, Subscription, User
+
+
+def test_feed_keeps_recipes_after_author_loses_followers(
+    user, user_client, recipes, monkeypatch,
+    django_capture_on_commit_callbacks
+):
+    author = User.objects.get(pk=recipes[0].author_id)
+    monkeypatch.setattr(feed, 'FEED_FANOUT_LIMIT', 1)
+    other = User.objects.get(pk=recipes[1].author_id)
+    Subscription.objects.create(user=other, author=author)
+    Subscription.objects.create(user=user, author=author)
+    with django_capture_on_commit_callbacks(execute=True):
+        recipe = Recipe.objects.create(
+            author=author, name='Новый', text='Описание', cooking_time=5,
+            image='recipes/images/test.png'
+        )
+    Subscription.objects.get(user=other, author=author).delete()
+    response = user_client.get('/api/recipes/feed/')
+    assert response.status_code == 200
+    assert recipe.id in {item['id'] for item in response.data['results']}
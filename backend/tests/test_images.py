@@ -0,0 +1,43 @@
+import base64
+
+import pytest
+from rest_framework.exceptions import ValidationError
+
+from api import fields
+from api.benchmark import make_image
+from recipes.models import Ingredient, Recipe
+
+
+def test_replaced_image_renditions_are_deleted(
+    user_client, settings, tmp_path, django_capture_on_commit_callbacks
+):
+    settings.MEDIA_ROOT = tmp_path
+    settings.IMAGE_WORKERS = 0
+    ingredient = Ingredient.objects.create(name='Соль', measurement_unit='г')
+    data = {'name': 'Рецепт', 'text': 'Описание', 'cooking_time': 10,
+            'image': make_image(),
+            'ingredients': [{'id': ingredient.id, 'amount': 1}]}
+    with django_capture_on_commit_callbacks(execute=True):
+        response = user_client.post('/api/recipes/', data, format='json')
+    recipe = Recipe.objects.get(pk=response.data['id'])
+    old = [recipe.image_thumbnail, recipe.image_webp]
+    assert all(rendition.storage.exists(rendition.name) for rendition in old)
+    with django_capture_on_commit_callbacks(execute=True):
+        user_client.patch(f'/api/recipes/{recipe.id}/',
+                          {**data, 'image': make_image()}, format='json')
+    recipe.refresh_from_db()
+    assert recipe.image_thumbnail and recipe.image_webp
+    assert not any(rendition.storage.exists(rendition.name)
+                   for rendition in old)
+
+
+def test_wrapped_base64_is_decoded_across_windows(monkeypatch):
+    monkeypatch.setattr(fields, 'DECODE_CHUNK_SIZE', 7)
+    header, encoded = make_image().split(',')
+    wrapped = '\r\n'.join(encoded[position:position + 5]
+                          for position in range(0, len(encoded), 5))
+    field = fields.Base64ImageField()
+    file = field.decode(f'{header},{wrapped}')
+    assert file.read() == base64.b64decode(encoded)
+    with pytest.raises(ValidationError):
+        field.decode(f'{header},{wrapped[:-2]}')
@@ -0,0 +1,17 @@
+from recipes.models import Ingredient
+
+INGREDIENT_FIELDS = {'id', 'name', 'measurement_unit'}
+
+
+def test_ingredient_list_has_one_shape_with_and_without_search(
+    user_client, recipes
+):
+    ingredient = Ingredient.objects.order_by('id').first()
+    for params in ({}, {'name': 'прод'}):
+        response = user_client.get('/api/ingredients/', params)
+        assert response.status_code == 200
+        assert response.json()
+        assert all(set(item) == INGREDIENT_FIELDS
+                   for item in response.json())
+    response = user_client.get(f'/api/ingredients/{ingredient.id}/')
+    assert set(response.json()) == INGREDIENT_FIELDS
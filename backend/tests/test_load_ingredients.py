@@ -0,0 +1,41 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from recipes.models import Ingredient
+
+
+def load(path, *args):
+    stdout = StringIO()
+    call_command('load_ingredients', path, *args, stdout=stdout)
+    return stdout.getvalue()
+
+
+def test_last_unit_in_chunk_corrects_single_row(db, tmp_path):
+    Ingredient.objects.create(name='Соль', measurement_unit='г')
+    path = tmp_path / 'ingredients.csv'
+    path.write_text('Соль,кг\nСоль,щепотка\nПерец,г\nПерец,г\n',
+                    encoding='utf-8')
+    assert 'Добавлено: 2, обновлено: 1, пропущено: 1.' in load(path)
+    assert set(Ingredient.objects.values_list('name', 'measurement_unit')) == {
+        ('Соль', 'щепотка'), ('Соль', 'кг'), ('Перец', 'г')
+    }
+    assert 'Добавлено: 0, обновлено: 0, пропущено: 4.' in load(path)
+
+
+def test_errors_outside_parsing_are_not_reported_as_bad_file(
+    db, tmp_path, monkeypatch
+):
+    with pytest.raises(CommandError):
+        load(tmp_path / 'missing.csv')
+    path = tmp_path / 'ingredients.csv'
+    path.write_text('Соль,г\n', encoding='utf-8')
+
+    def broken(*args, **kwargs):
+        raise KeyError('bug')
+
+    monkeypatch.setattr(Ingredient.objects, 'bulk_create', broken)
+    with pytest.raises(KeyError):
+        load(path)
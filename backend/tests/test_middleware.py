@@ -0,0 +1,22 @@
+import json
+import logging
+import re
+
+from recipes.models import ShoppingCart
+
+
+def test_streamed_body_queries_are_logged(
+    user, user_client, recipes, settings, caplog
+):
+    settings.MIDDLEWARE = ['api.middleware.SQLInstrumentationMiddleware',
+                           *settings.MIDDLEWARE]
+    settings.SQL_QUERY_BUDGET = 0
+    ShoppingCart.objects.create(user=user, recipe=recipes[0])
+    with caplog.at_level(logging.WARNING, logger='api.middleware'):
+        response = user_client.get('/api/recipes/download_shopping_cart/')
+        assert not caplog.records
+        b''.join(response.streaming_content)
+    header_queries = int(
+        re.search(r'(\d+) queries', response['Server-Timing']).group(1)
+    )
+    assert json.loads(caplog.records[-1].message)['queries'] > header_queries
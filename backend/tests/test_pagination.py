@@ -0,0 +1,48 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from recipes.models import Recipe, Subscription
+
+
+def walk(client, url, params):
+    pages = []
+    response = client.get(url, params)
+    while True:
+        assert response.status_code == 200
+        pages.append([recipe['id'] for recipe in response.data['results']])
+        if not response.data['next']:
+            return pages, response
+        response = client.get(response.data['next'])
+
+
+def test_cursor_pages_through_equal_created_at_without_offset(
+    user_client, recipes
+):
+    Recipe.objects.update(created_at=timezone.now())
+    with CaptureQueriesContext(connection) as queries:
+        pages, last = walk(user_client, '/api/recipes/',
+                           {'pagination': 'cursor', 'limit': 3})
+    assert sum(pages, []) == sorted(
+        (recipe.id for recipe in recipes), reverse=True
+    )
+    assert not any('OFFSET' in query['sql'] for query in queries)
+    previous = user_client.get(last.data['previous'])
+    assert [recipe['id'] for recipe in previous.data['results']] == pages[-2]
+
+
+def test_feed_cursor_pages_through_equal_created_at(
+    user, user_client, recipes
+):
+    Recipe.objects.update(created_at=timezone.now())
+    for recipe in recipes:
+        Subscription.objects.create(user=user, author=recipe.author)
+    pages, _ = walk(user_client, '/api/recipes/feed/', {'limit': 3})
+    assert sum(pages, []) == sorted(
+        (recipe.id for recipe in recipes), reverse=True
+    )
+
+
+def test_invalid_cursor_is_not_found(user_client, recipes):
+    response = user_client.get('/api/recipes/', {'cursor': 'cD14JnA9eQ=='})
+    assert response.status_code == 404
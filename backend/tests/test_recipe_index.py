@@ -0,0 +1,100 @@
+from unittest import mock
+
+import pytest
+from django.utils import timezone
+
+from api.cache import bump_version
+from api.recipe_index import MATCH_VERSION_KEY, RecipeIngredientIndex
+from recipes.models import Ingredient, Recipe, RecipeIngredient
+
+
+def test_index_sees_changes_made_by_other_processes(recipes):
+    index = RecipeIngredientIndex()
+    ingredient = Ingredient.objects.order_by('id').first()
+    assert len(index.match([ingredient.id], max_missing=5)) == len(recipes)
+    # Изменения другого процесса: своё состояние он публикует только
+    # через updated_at рецептов и версию в общем кэше
+    RecipeIngredient.objects.filter(recipe=recipes[0],
+                                    ingredient=ingredient).delete()
+    Recipe.objects.filter(pk=recipes[0].pk).update(updated_at=timezone.now())
+    Recipe.objects.filter(pk=recipes[1].pk).delete()
+    bump_version(MATCH_VERSION_KEY)
+    index.invalidate()
+    assert set(index.match([ingredient.id], max_missing=5)) == {
+        recipe.pk for recipe in recipes[2:]
+    }
+    Recipe.objects.filter(pk=recipes[2].pk).update(updated_at=timezone.now())
+    RecipeIngredient.objects.filter(recipe=recipes[2]).delete()
+    index.invalidate()
+    assert recipes[2].pk not in index.match([ingredient.id], max_missing=5)
+
+
+def test_catalog_edits_reload_only_touched_recipes(recipes):
+    index = RecipeIngredientIndex()
+    ingredient = Ingredient.objects.order_by('id').first()
+    index.match([ingredient.id])
+    new_ingredient = Ingredient.objects.create(name='Новый',
+                                               measurement_unit='г')
+    RecipeIngredient.objects.create(recipe=recipes[0],
+                                    ingredient=new_ingredient, amount=1)
+    Recipe.objects.filter(pk=recipes[0].pk).touch()
+    index.invalidate()
+    with mock.patch.object(index, 'build') as build:
+        assert index.match([new_ingredient.id], max_missing=5) == [
+            recipes[0].pk
+        ]
+    build.assert_not_called()
+
+
+def create_recipes(author, ingredients, compositions):
+    recipe_ids = []
+    for number, names in enumerate(compositions):
+        recipe = Recipe.objects.create(
+            author=author, name=f'Рецепт {number}', text='Описание',
+            cooking_time=10, image='recipes/images/test.png'
+        )
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(recipe=recipe, ingredient=ingredients[name],
+                             amount=1)
+            for name in names
+        )
+        recipe_ids.append(recipe.id)
+    return recipe_ids
+
+
+@pytest.mark.parametrize('max_missing, expected', [
+    (None, [2, 0]), (1, [2, 0, 1]), (2, [2, 0, 1, 3]),
+])
+def test_have_orders_by_share_then_missing_then_newest(
+    user, user_client, max_missing, expected
+):
+    ingredients = {
+        name: Ingredient.objects.create(name=name, measurement_unit='г')
+        for name in 'abcd'
+    }
+    recipe_ids = create_recipes(user, ingredients,
+                                ['ab', 'abc', 'a', 'acd', 'cd'])
+    params = {'have': f'{ingredients["a"].id},{ingredients["b"].id}'}
+    if max_missing is not None:
+        params['max_missing'] = max_missing
+    response = user_client.get('/api/recipes/', params)
+    assert response.status_code == 200
+    assert [item['id'] for item in response.data['results']] == [
+        recipe_ids[position] for position in expected
+    ]
+
+
+def test_have_respects_result_limit_and_page_size(user, user_client):
+    ingredient = Ingredient.objects.create(name='Соль', measurement_unit='г')
+    recipe_ids = create_recipes(user, {'a': ingredient}, ['a'] * 4)
+    index = RecipeIngredientIndex()
+    assert index.match([ingredient.id], limit=2) == recipe_ids[:-3:-1]
+    response = user_client.get('/api/recipes/',
+                               {'have': ingredient.id, 'limit': 3})
+    assert response.data['count'] == 4
+    assert [item['id'] for item in response.data['results']] == (
+        recipe_ids[:-4:-1]
+    )
+    response = user_client.get('/api/recipes/',
+                               {'have': ingredient.id, 'max_missing': -1})
+    assert response.status_code == 400
@@ -0,0 +1,43 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.benchmark import make_image
+from recipes.models import Ingredient
+
+
+@pytest.mark.parametrize('limit', [2, 6])
+def test_recipe_list_queries_do_not_depend_on_page_size(
+    user_client, recipes, limit, django_assert_num_queries
+):
+    # Подсчёт, страница вместе с авторами, id авторов из подписок
+    # и ингредиенты всех рецептов страницы одной предвыборкой
+    with django_assert_num_queries(4):
+        response = user_client.get('/api/recipes/', {'limit': limit})
+    assert response.status_code == 200
+    assert len(response.data['results']) == limit
+    assert all(recipe['ingredients'] for recipe in response.data['results'])
+
+
+def test_recipe_create_queries_do_not_depend_on_ingredients(
+    user_client, recipes, settings, tmp_path
+):
+    settings.MEDIA_ROOT = tmp_path
+    settings.IMAGE_WORKERS = 0
+    ingredients = Ingredient.objects.bulk_create(
+        Ingredient(name=f'Ингредиент {number}', measurement_unit='г')
+        for number in range(10)
+    )
+    counts = []
+    for size in (1, 10):
+        data = {'name': 'Рецепт', 'text': 'Описание', 'cooking_time': 10,
+                'image': make_image(),
+                'ingredients': [{'id': ingredient.id, 'amount': 1}
+                                for ingredient in ingredients[:size]]}
+        with CaptureQueriesContext(connection) as queries:
+            response = user_client.post('/api/recipes/', data,
+                                        format='json')
+        assert response.status_code == 201
+        assert len(response.data['ingredients']) == size
+        counts.append(len(queries))
+    assert counts[0] == counts[1]
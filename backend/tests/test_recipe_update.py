@@ -0,0 +1,74 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.benchmark import make_image
+from recipes.models import Ingredient, RecipeIngredient
+
+
+@pytest.fixture
+def recipe_data(user_client, settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    settings.IMAGE_WORKERS = 0
+    ingredients = Ingredient.objects.bulk_create(
+        Ingredient(name=f'Ингредиент {number}', measurement_unit='г')
+        for number in range(4)
+    )
+    data = {'name': 'Рецепт', 'text': 'Описание', 'cooking_time': 10,
+            'image': make_image(),
+            'ingredients': [{'id': ingredient.id, 'amount': 1}
+                            for ingredient in ingredients[:3]]}
+    response = user_client.post('/api/recipes/', data, format='json')
+    assert response.status_code == 201
+    return response.data['id'], data, ingredients
+
+
+def get_rows(recipe_id):
+    return {
+        ingredient_id: (row_id, amount)
+        for row_id, ingredient_id, amount in RecipeIngredient.objects
+        .filter(recipe_id=recipe_id)
+        .values_list('id', 'ingredient_id', 'amount')
+    }
+
+
+def test_update_applies_ingredient_diff(user_client, recipe_data):
+    recipe_id, data, ingredients = recipe_data
+    before = get_rows(recipe_id)
+    data['ingredients'] = [
+        {'id': ingredients[0].id, 'amount': 1},
+        {'id': ingredients[1].id, 'amount': 5},
+        {'id': ingredients[3].id, 'amount': 2},
+    ]
+    response = user_client.patch(f'/api/recipes/{recipe_id}/', data,
+                                 format='json')
+    assert response.status_code == 200
+    after = get_rows(recipe_id)
+    assert set(after) == {ingredients[0].id, ingredients[1].id,
+                          ingredients[3].id}
+    # Оставшиеся строки не пересоздаются
+    assert after[ingredients[0].id] == before[ingredients[0].id]
+    assert after[ingredients[1].id] == (before[ingredients[1].id][0], 5)
+    assert after[ingredients[3].id][1] == 2
+
+
+def test_changing_one_amount_does_not_rewrite_ingredients(
+    user_client, recipe_data
+):
+    recipe_id, data, ingredients = recipe_data
+    data = {**data, 'ingredients': [
+        {**ingredient, 'amount': 7} if number == 0 else ingredient
+        for number, ingredient in enumerate(data['ingredients'])
+    ]}
+    del data['image']
+    with CaptureQueriesContext(connection) as queries:
+        response = user_client.patch(f'/api/recipes/{recipe_id}/', data,
+                                     format='json')
+    assert response.status_code == 200
+    table = f'"{RecipeIngredient._meta.db_table}"'
+    writes = [query['sql'] for query in queries
+              if query['sql'].startswith((f'INSERT INTO {table}',
+                                          f'UPDATE {table}',
+                                          f'DELETE FROM {table}'))]
+    assert len(writes) == 1 and writes[0].startswith('UPDATE')
+    assert get_rows(recipe_id)[ingredients[0].id][1] == 7
@@ -0,0 +1,25 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.benchmark import make_image
+from recipes.models import Ingredient, Recipe
+
+
+def test_all_missing_ingredients_are_reported_at_once(user_client, recipes):
+    ingredient = Ingredient.objects.order_by('id').first()
+    missing = [ingredient.id + 1000, ingredient.id + 2000]
+    data = {'name': 'Рецепт', 'text': 'Описание', 'cooking_time': 10,
+            'image': make_image(),
+            'ingredients': [{'id': ingredient.id, 'amount': 1},
+                            *({'id': ingredient_id, 'amount': 1}
+                              for ingredient_id in missing)]}
+    count = Recipe.objects.count()
+    with CaptureQueriesContext(connection) as queries:
+        response = user_client.post('/api/recipes/', data, format='json')
+    assert response.status_code == 400
+    assert response.data['ingredients'] == [
+        f'Ингредиенты не найдены: {missing[0]}, {missing[1]}.'
+    ]
+    table = f'"{Ingredient._meta.db_table}"'
+    assert sum(f'FROM {table}' in query['sql'] for query in queries) == 1
+    assert Recipe.objects.count() == count
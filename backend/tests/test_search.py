@@ -0,0 +1,52 @@
+from api.benchmark import make_image
+from recipes.models import Ingredient, Recipe, RecipeIngredient
+
+
+def test_created_and_updated_recipes_are_found_by_ingredients(
+    user_client, settings, tmp_path
+):
+    settings.MEDIA_ROOT = tmp_path
+    settings.IMAGE_WORKERS = 0
+    basil, thyme = Ingredient.objects.bulk_create([
+        Ingredient(name='Базилик', measurement_unit='г'),
+        Ingredient(name='Тимьян', measurement_unit='г'),
+    ])
+    data = {'name': 'Соус', 'text': 'Описание', 'cooking_time': 10,
+            'image': make_image(),
+            'ingredients': [{'id': basil.id, 'amount': 1}]}
+    # Без django_capture_on_commit_callbacks: индекс не должен зависеть
+    # от хуков после коммита
+    recipe_id = user_client.post('/api/recipes/', data,
+                                 format='json').data['id']
+    found = user_client.get('/api/recipes/', {'search': 'базилик'})
+    assert [item['id'] for item in found.data['results']] == [recipe_id]
+    data['ingredients'] = [{'id': thyme.id, 'amount': 1}]
+    user_client.patch(f'/api/recipes/{recipe_id}/', data, format='json')
+    assert not user_client.get('/api/recipes/',
+                               {'search': 'базилик'}).data['results']
+    found = user_client.get('/api/recipes/', {'search': 'тимьян'})
+    assert [item['id'] for item in found.data['results']] == [recipe_id]
+
+
+def test_search_ranks_name_over_ingredients_over_text(user, user_client):
+    salt = Ingredient.objects.create(name='Соль', measurement_unit='г')
+    garlic = Ingredient.objects.create(name='Чеснок', measurement_unit='г')
+
+    def create(name, text, ingredient):
+        recipe = Recipe.objects.create(
+            author=user, name=name, text=text, cooking_time=10,
+            image='recipes/images/test.png'
+        )
+        RecipeIngredient.objects.create(recipe=recipe, ingredient=ingredient,
+                                        amount=1)
+        Recipe.objects.filter(pk=recipe.pk).update_search_index()
+        return recipe.id
+
+    in_text = create('Суп', 'Подавать с чесноком', salt)
+    in_ingredients = create('Соус', 'Перемешать', garlic)
+    in_name = create('Хлеб с чесноком', 'Испечь', salt)
+    create('Салат', 'Нарезать', salt)
+    response = user_client.get('/api/recipes/', {'search': 'чеснок'})
+    assert [item['id'] for item in response.data['results']] == [
+        in_name, in_ingredients, in_text
+    ]
@@ -0,0 +1,52 @@
+import csv
+import io
+import json
+
+import pytest
+
+from recipes.models import ShoppingCart
+
+URL = '/api/recipes/download_shopping_cart/'
+EXPECTED = [(f'Продукт {number}', 'г', 2) for number in range(3)]
+
+
+@pytest.fixture
+def cart(user, recipes):
+    for recipe in recipes[:2]:
+        ShoppingCart.objects.create(user=user, recipe=recipe)
+
+
+def download(client, file_format):
+    response = client.get(URL, {'format': file_format})
+    assert response.status_code == 200
+    assert response['Content-Disposition'] == (
+        f'attachment; filename="shopping_list.{file_format}"'
+    )
+    return b''.join(response.streaming_content).decode()
+
+
+def test_shopping_list_as_txt(user_client, cart):
+    assert download(user_client, 'txt') == 'Список покупок:\n\n' + ''.join(
+        f'- {name}: {amount} {unit}\n' for name, unit, amount in EXPECTED
+    )
+
+
+def test_shopping_list_as_csv(user_client, cart):
+    rows = list(csv.reader(io.StringIO(download(user_client, 'csv'))))
+    assert rows == [
+        ['Ингредиент', 'Единица измерения', 'Количество'],
+        *([name, unit, str(amount)] for name, unit, amount in EXPECTED),
+    ]
+
+
+def test_shopping_list_as_json(user_client, cart):
+    assert json.loads(download(user_client, 'json')) == [
+        {'name': name, 'measurement_unit': unit, 'amount': amount}
+        for name, unit, amount in EXPECTED
+    ]
+
+
+def test_empty_shopping_list(user_client, recipes):
+    response = user_client.get(URL)
+    assert response.status_code == 200
+    assert response.json() == {'detail': 'Список покупок пуст.'}